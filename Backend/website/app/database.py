@@ -2,6 +2,8 @@
 Database configuration using SQLAlchemy
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -24,6 +26,7 @@ if not DATABASE_URL:
 # - pool_size: 20-30 (base connections)
 # - max_overflow: 50-70 (additional connections when needed)
 # - Total possible: pool_size + max_overflow = 70-100 connections
+# Check db_pool_checked_out / db_pool_overflow at GET /metrics before changing these
 engine = create_engine(
     DATABASE_URL,
     pool_size=25,           # Base pool size (connections always available)
@@ -36,6 +39,43 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _to_async_url(url: str) -> str:
+    """Convert a sync PostgreSQL URL into an asyncpg URL"""
+    async_url = make_url(url)
+    if async_url.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+        async_url = async_url.set(drivername="postgresql+asyncpg")
+    # asyncpg does not understand libpq's sslmode, it uses ssl instead
+    if "sslmode" in async_url.query:
+        query = dict(async_url.query)
+        query["ssl"] = query.pop("sslmode")
+        async_url = async_url.set(query=query)
+    return async_url.render_as_string(hide_password=False)
+
+
+# Async database URL (defaults to DATABASE_URL with the asyncpg driver)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+# Async engine used by the route handlers so DB round-trips don't block the event loop
+# Same pool sizing as the sync engine (see comments above)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=25,
+    max_overflow=75,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=False
+)
+
+# Async session factory
+# expire_on_commit=False: objects stay usable after commit (lazy refresh is not possible in async)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -48,3 +88,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async database session dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        yield db
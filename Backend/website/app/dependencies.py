@@ -3,19 +3,22 @@ Dependencies for FastAPI routes
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, Credential
 from app.utils.jwt import verify_token
+from app.utils.auth_cache import principal_cache
 
 security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
+async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current authenticated user from JWT token"""
     if credentials is None:
@@ -25,7 +28,11 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    token = credentials.credentials
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """Resolve a JWT token into its User (shared by HTTP and WebSocket auth)"""
     payload = verify_token(token)
     
     email: str = payload.get("sub")
@@ -36,16 +43,19 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Steady state: cached principal, re-attached to this session without a query
+    cached_user = principal_cache.get(email)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+    
     # Optimized: Single query with eager loading to get user
     # JWT token now uses email instead of username
-    from sqlalchemy.orm import joinedload
-    
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.email == email)
-        .first()
+        .where(User.email == email)
     )
+    user = result.scalars().first()
     
     if user is None:
         raise HTTPException(
@@ -54,10 +64,11 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    principal_cache.put(email, user)
     return user
 
 
-def get_current_admin_user(
+async def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Get current authenticated user and verify they are an admin"""
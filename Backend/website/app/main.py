@@ -2,10 +2,7 @@
 FastAPI application main file
 """
 import logging
-import time
-import re
 from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
@@ -14,10 +11,19 @@ from dotenv import load_dotenv
 import os
 
 # Import database
-from app.database import engine, Base
+from app.database import engine, async_engine, Base
+
+# Import broadcast layer
+from app.utils.broadcast import broadcast, MemoryBroadcast, configured_workers
+from app.utils.log_store import log_store
+from app.utils.password import start_password_pool, stop_password_pool
+from app.utils.origins import origin_matcher, MatcherCORSMiddleware
+from app.utils.query_profiler import install_query_profiler
+from app.utils.responses import FastJSONResponse
+from app.middleware import RequestLogMiddleware, RequestMetricsMiddleware, QueryProfilerMiddleware
 
 # Import routers
-from app.routers import health, users, chats, chat_messages, auth, logs, credential
+from app.routers import health, users, chats, chat_messages, auth, logs, credential, metrics
 
 # Load environment variables
 load_dotenv()
@@ -34,9 +40,44 @@ except Exception as e:
 app = FastAPI(
     title="Backend API",
     version="1.0.0",
-    description="FastAPI Backend with PostgreSQL"
+    description="FastAPI Backend with PostgreSQL",
+    # orjson rendering for every response (see app/utils/responses.py)
+    default_response_class=FastJSONResponse
 )
 
+# Per-request SQL profiling (query count / DB time, see QueryProfilerMiddleware below)
+install_query_profiler(engine, async_engine.sync_engine)
+
+
+@app.on_event("startup")
+async def start_broadcast():
+    """Connect the cross-worker broadcast backend (chat events, log streaming)"""
+    await broadcast.connect()
+    workers = configured_workers()
+    if workers > 1 and isinstance(broadcast, MemoryBroadcast):
+        # Events and auth cache invalidations would stay inside each worker
+        logging.getLogger("app").warning(
+            "Running %d workers with BROADCAST_BACKEND=memory: chat events, log streams and auth cache "
+            "invalidations are not shared between workers (set BROADCAST_BACKEND=postgres)",
+            workers
+        )
+
+
+@app.on_event("startup")
+async def warm_password_pool():
+    """Start the password hashing workers so the first logins don't pay for it"""
+    await start_password_pool()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    """Close the broadcast backend, pooled async database connections, log segments and password workers on shutdown"""
+    await broadcast.disconnect()
+    await async_engine.dispose()
+    log_store.close()
+    stop_password_pool()
+
+
 # Setup logging
 # Import logs router first to setup logging handlers (this sets up stream handler)
 # Then get logger
@@ -44,41 +85,13 @@ app_logger = logging.getLogger("app")
 # Also use root logger to ensure all logs are captured
 root_logger = logging.getLogger()
 
-# Helper function to check if origin is allowed (localhost, 127.0.0.1, or local network IP)
-def is_allowed_origin(origin: str) -> bool:
-    """Check if origin is allowed (localhost, 127.0.0.1, or local network IP)"""
-    if not origin:
-        return False
-    
-    # Check exact matches
-    allowed_exact = [
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:3001",
-    ]
-    if origin in allowed_exact:
-        return True
-    
-    # Check local network IP addresses (192.168.x.x, 10.x.x.x, 172.16-31.x.x)
-    local_network_pattern = r"^http://(192\.168\.\d+\.\d+|10\.\d+\.\d+\.\d+|172\.(1[6-9]|2[0-9]|3[0-1])\.\d+\.\d+):(3000|3001|8000)$"
-    if re.match(local_network_pattern, origin):
-        return True
-    
-    return False
-
 # CORS middleware - MUST be added before other middleware
 # Order matters: CORS should be first to handle preflight requests
-# Allow localhost, 127.0.0.1, and local network IP addresses (192.168.x.x, 10.x.x.x, 172.16-31.x.x)
+# Origin policy (exact origins + regex, configurable with CORS_ORIGINS / CORS_ORIGIN_REGEX)
+# lives in app/utils/origins.py and is shared with the exception handlers below
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:3001",
-    ],
-    allow_origin_regex=r"http://(192\.168\.\d+\.\d+|10\.\d+\.\d+\.\d+|172\.(1[6-9]|2[0-9]|3[0-1])\.\d+\.\d+):(3000|3001|8000)",
+    MatcherCORSMiddleware,
+    matcher=origin_matcher,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
@@ -109,11 +122,12 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions with CORS headers"""
     response = JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers  # e.g. Retry-After on 503, WWW-Authenticate on 401
     )
     # Add CORS headers manually
     origin = request.headers.get("origin")
-    if is_allowed_origin(origin):
+    if origin_matcher.is_allowed(origin):
         response.headers["Access-Control-Allow-Origin"] = origin
         response.headers["Access-Control-Allow-Credentials"] = "true"
     return response
@@ -128,45 +142,18 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
     # Add CORS headers manually
     origin = request.headers.get("origin")
-    if is_allowed_origin(origin):
+    if origin_matcher.is_allowed(origin):
         response.headers["Access-Control-Allow-Origin"] = origin
         response.headers["Access-Control-Allow-Credentials"] = "true"
     return response
 
-# Request logging middleware (optimized - only log slow requests in production)
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all HTTP requests"""
-    start_time = time.time()
-    
-    try:
-    # Process request
-    response = await call_next(request)
-    
-        # Ensure CORS headers are present on all responses
-        origin = request.headers.get("origin")
-        if origin and is_allowed_origin(origin):
-            if "Access-Control-Allow-Origin" not in response.headers:
-                response.headers["Access-Control-Allow-Origin"] = origin
-                response.headers["Access-Control-Allow-Credentials"] = "true"
-    
-    # Log response
-    process_time = time.time() - start_time
-    
-    # Only log slow requests (>1s) or errors to reduce logging overhead
-    if process_time > 1.0 or response.status_code >= 400:
-        app_logger.info(
-            f"{request.method} {request.url.path} - "
-            f"Status: {response.status_code} - "
-            f"Time: {process_time:.3f}s - "
-            f"Client: {request.client.host if request.client else 'unknown'}"
-        )
-    
-    return response
-    except Exception as e:
-        # Log the error
-        app_logger.error(f"Error processing request: {e}", exc_info=True)
-        raise
+# Request logging middleware (optimized - only log slow requests and errors)
+# Pure ASGI (see app/middleware.py); added last so it wraps everything else
+app.add_middleware(RequestLogMiddleware)
+# Per-request SQL profiling: per-route query metrics, N+1 / slow query warnings (Server-Timing with SQL_SERVER_TIMING)
+app.add_middleware(QueryProfilerMiddleware)
+# Request metrics for /metrics (outermost: latency includes every other middleware)
+app.add_middleware(RequestMetricsMiddleware)
 
 # Include routers
 app.include_router(health.router)
@@ -176,3 +163,4 @@ app.include_router(credential.router)
 app.include_router(chats.router)
 app.include_router(chat_messages.router)
 app.include_router(logs.router)
+app.include_router(metrics.router)
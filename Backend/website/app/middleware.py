@@ -0,0 +1,127 @@
+"""
+Pure ASGI middleware
+(no BaseHTTPMiddleware: no extra task or response stream wrapping per request)
+"""
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import request_metrics
+from app.utils.query_profiler import QueryStats, current_query_stats, SQL_SERVER_TIMING
+
+logger = logging.getLogger("app")
+
+# Requests slower than this (seconds) are logged even when successful
+SLOW_REQUEST_SECONDS = 1.0
+
+
+class RequestLogMiddleware:
+    """Log slow requests (>1s) and error responses"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            logger.error(f"Error processing request: {e}", exc_info=True)
+            raise
+
+        process_time = time.perf_counter() - start_time
+        # Only log slow requests or errors to reduce logging overhead
+        if process_time > SLOW_REQUEST_SECONDS or status_code >= 400:
+            client = scope.get("client")
+            logger.info(
+                f"{scope['method']} {scope['path']} - "
+                f"Status: {status_code} - "
+                f"Time: {process_time:.3f}s - "
+                f"Client: {client[0] if client else 'unknown'}"
+            )
+
+
+def _route_label(scope: Scope) -> str:
+    # Route template (e.g. /chats/{chat_id}), set by the router once matched;
+    # unmatched paths share one label so junk URLs can't blow up the series count
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class QueryProfilerMiddleware:
+    """
+    Collect the SQL activity of each request (see app/utils/query_profiler.py):
+    per-route query metrics, a warning for requests over the thresholds
+    and, with server_timing (SQL_SERVER_TIMING), a Server-Timing header
+    """
+    def __init__(self, app: ASGIApp, server_timing: bool = SQL_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_with_timing(message: Message):
+            # Queries run after the headers are sent (streamed bodies) only reach the metrics and the log
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing if self.server_timing else send)
+        finally:
+            current_query_stats.reset(token)
+            route = _route_label(scope)
+            request_metrics.observe_queries(scope["method"], route, stats.count, stats.total_seconds)
+            if stats.exceeds_thresholds():
+                statement = " ".join((stats.slowest_statement or "").split())[:200]
+                logger.warning(
+                    f"SQL: {scope['method']} {route} ran {stats.count} queries "
+                    f"in {stats.total_seconds * 1000:.1f}ms "
+                    f"(slowest {stats.slowest_seconds * 1000:.1f}ms: {statement})"
+                )
+
+
+class RequestMetricsMiddleware:
+    """Record per-route latency, status counts and in-flight requests (served at /metrics)"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            request_metrics.observe(scope["method"], _route_label(scope), status_code, time.perf_counter() - start_time)
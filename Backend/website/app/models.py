@@ -1,8 +1,9 @@
 """
 SQLAlchemy models based on Prisma schema
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, Boolean, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -13,13 +14,18 @@ chat_users = Table(
     Column('chatId', Integer, ForeignKey('Chat.id', ondelete='CASCADE'), primary_key=True),
     Column('userId', Integer, ForeignKey('User.id', ondelete='CASCADE'), primary_key=True),
     Column('joinedAt', DateTime(timezone=True), server_default=func.now()),
-    Column('role', String, default='member')  # 'member', 'admin', 'owner'
+    Column('role', String, default='member'),  # 'member', 'admin', 'owner'
+    # Read state, maintained by app/utils/chat_summary.py
+    Column('lastReadMessageId', Integer, nullable=True),
+    Column('unreadCount', Integer, server_default='0', nullable=False)
 )
 
 
 class User(Base):
     """User model - User information and profile"""
     __tablename__ = "User"
+    # Fetch server-generated defaults (createdAt/updatedAt) via RETURNING so async sessions never lazy-load them
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -42,6 +48,7 @@ class User(Base):
 class Credential(Base):
     """Credential model - Authentication credentials (separated for security)"""
     __tablename__ = "Credential"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     userId = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"), unique=True, nullable=False, index=True)
@@ -57,21 +64,41 @@ class Credential(Base):
 class Chat(Base):
     """Chat room model - supports multi-user"""
     __tablename__ = "Chat"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=True)  # Optional chat room name
     createdAt = Column(DateTime(timezone=True), server_default=func.now())
     updatedAt = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     lastUsed = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Denormalised summary for the chat list, maintained by app/utils/chat_summary.py
+    messageCount = Column(Integer, server_default='0', nullable=False)
+    # Cleared by the database when that message is deleted (use_alter: Chat and ChatMessage reference each other)
+    lastMessageId = Column(
+        Integer,
+        ForeignKey("ChatMessage.id", ondelete="SET NULL", use_alter=True, name="Chat_lastMessageId_fkey"),
+        nullable=True
+    )
+    lastMessageUserId = Column(Integer, nullable=True)
+    lastMessagePreview = Column(String, nullable=True)
+    lastMessageAt = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     users = relationship("User", secondary=chat_users, back_populates="chats")
-    messages = relationship("ChatMessage", back_populates="chat", cascade="all, delete-orphan")
+    messages = relationship(
+        "ChatMessage", back_populates="chat", foreign_keys="ChatMessage.chatId", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # Lets ON DELETE SET NULL find the chat of a deleted message without scanning Chat
+        Index("Chat_lastMessageId_idx", "lastMessageId"),
+    )
 
 
 class ChatMessage(Base):
     """Message in a chat room"""
     __tablename__ = "ChatMessage"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     chatId = Column(Integer, ForeignKey("Chat.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -79,7 +106,16 @@ class ChatMessage(Base):
     message = Column(String, nullable=False)
     createdAt = Column(DateTime(timezone=True), server_default=func.now())
     updatedAt = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Full-text search document, generated by PostgreSQL (deferred: never loaded with messages)
+    searchVector = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', message)", persisted=True)))
 
     # Relationships
-    chat = relationship("Chat", back_populates="messages")
+    chat = relationship("Chat", back_populates="messages", foreign_keys=[chatId])
     sender = relationship("User", back_populates="messages")
+
+    __table_args__ = (
+        # Keyset pagination index for chat history (WHERE chatId = ? ORDER BY createdAt, id)
+        Index("ChatMessage_chatId_createdAt_id_idx", "chatId", "createdAt", "id"),
+        # Full-text search (app/utils/message_search.py)
+        Index("ChatMessage_searchVector_idx", "searchVector", postgresql_using="gin"),
+    )
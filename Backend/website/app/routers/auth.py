@@ -1,12 +1,14 @@
 """
 Authentication routes
 """
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from pydantic import BaseModel
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, Credential
 from app.schemas.user import (
     UserLogin, 
@@ -22,6 +24,8 @@ from app.utils.jwt import create_access_token
 from app.dependencies import get_current_user
 from app.utils.password import verify_password, hash_password
 from app.utils.verification import generate_verification_token
+from app.utils.auth_cache import principal_cache
+from app.utils.etag import make_etag, etag_matches, set_etag, not_modified
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -47,18 +51,18 @@ class ResendVerificationResponse(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Login with email and password
     Optimized for high concurrency (70+ concurrent logins)
     """
     # Find user by email
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.email == credentials.email)
-        .first()
+        .where(User.email == credentials.email)
     )
+    user = result.scalars().first()
     
     if not user:
         # Use same error message to prevent email enumeration
@@ -102,17 +106,16 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 @router.post("/verify-email", response_model=MessageResponse)
 async def verify_email(
     request: VerifyEmailRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verify email with verification token
     Token will be kept until password is set
     """
-    user = (
-        db.query(User)
-        .filter(User.verificationToken == request.token)
-        .first()
+    result = await db.execute(
+        select(User).where(User.verificationToken == request.token)
     )
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(
@@ -128,7 +131,8 @@ async def verify_email(
     
     # Mark email as verified (keep token for set-password step)
     user.emailVerified = True
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return MessageResponse(
         message="Email verified successfully. You can now set your password.",
@@ -139,18 +143,18 @@ async def verify_email(
 @router.post("/set-password", response_model=MessageResponse)
 async def set_password(
     request: SetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Set password after email verification
     Requires verification token
     """
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.verificationToken == request.token)
-        .first()
+        .where(User.verificationToken == request.token)
     )
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(
@@ -185,7 +189,8 @@ async def set_password(
     
     # Clear verification token
     user.verificationToken = None
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return MessageResponse(
         message="Password set successfully",
@@ -196,14 +201,15 @@ async def set_password(
 @router.post("/resend-verification", response_model=ResendVerificationResponse)
 async def resend_verification(
     request: ResendVerificationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Resend verification email
     Returns verification token in response for development/testing
     In production, token should only be sent via email
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
     
     if not user:
         # Don't reveal if email exists (security)
@@ -222,7 +228,8 @@ async def resend_verification(
     # Generate new verification token
     new_token = generate_verification_token()
     user.verificationToken = new_token
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     # TODO: Send verification email here with token
     # In production, integrate with email service (SendGrid, AWS SES, etc.)
@@ -239,7 +246,7 @@ async def resend_verification(
 @router.post("/forgot-password", response_model=ForgotPasswordResponse)
 async def forgot_password(
     request: ForgotPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Request password reset - sends reset token via email
@@ -247,7 +254,8 @@ async def forgot_password(
     Returns reset token in response for development/testing
     In production, token should only be sent via email
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
     
     if not user:
         # Don't reveal if email exists (security)
@@ -268,12 +276,13 @@ async def forgot_password(
     # Then generate a new password reset token
     # This ensures only the latest token is valid
     user.passwordResetToken = None
-    db.flush()  # Clear old token before generating new one
+    await db.flush()  # Clear old token before generating new one
     
     # Generate new password reset token
     reset_token = generate_verification_token()
     user.passwordResetToken = reset_token
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     # TODO: Send password reset email here with token
     # In production, integrate with email service (SendGrid, AWS SES, etc.)
@@ -292,18 +301,18 @@ async def forgot_password(
 @router.post("/reset-password", response_model=MessageResponse)
 async def reset_password(
     request: ResetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Reset password using reset token
     Requires password reset token from forgot-password endpoint
     """
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.passwordResetToken == request.token)
-        .first()
+        .where(User.passwordResetToken == request.token)
     )
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(
@@ -339,7 +348,8 @@ async def reset_password(
     
     # Clear reset token
     user.passwordResetToken = None
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return MessageResponse(
         message="Password reset successfully",
@@ -349,15 +359,24 @@ async def reset_password(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get current authenticated user information"""
+    """Get current authenticated user information (ETag / If-None-Match supported)"""
+    # current_user already carries both versions: a refresh of unchanged data costs no query
+    credential = current_user.credential
+    etag = make_etag(current_user.id, current_user.updatedAt, credential.updatedAt if credential else None)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     # Eager load credential for response
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.id == current_user.id)
-        .first()
+        .where(User.id == current_user.id)
+        .execution_options(populate_existing=True)
     )
-    return user
+    return result.scalars().first()
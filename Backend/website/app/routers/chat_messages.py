@@ -1,60 +1,276 @@
 """
 Chat message routes
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import csv
+import io
+import json
+import zlib
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, exists, tuple_, literal, func, cast, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import AsyncGenerator, List, Literal, Optional
 
-from app.database import get_db
-from app.models import ChatMessage, Chat, User
-from app.schemas.chat_message import ChatMessageCreate, ChatMessageUpdate, ChatMessageResponse
-from app.dependencies import get_current_user
+from app.database import get_async_db, AsyncSessionLocal
+from app.models import ChatMessage, Chat, User, Credential, chat_users
+from app.schemas.chat_message import (
+    ChatMessageCreate,
+    ChatMessageBatchCreate,
+    ChatMessageUpdate,
+    ChatMessageResponse,
+    ChatMessageListResponse,
+    ChatMessageSearchResult
+)
+from app.dependencies import get_current_user, authenticate_token
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.message_search import search_messages
+from app.utils.etag import make_etag, etag_matches, set_etag, not_modified, chat_version
+from app.utils.chat_hub import chat_hub
+from app.utils.user_briefs import display_name, user_brief
+from app.utils.row_payloads import MESSAGE_COLUMNS, USER_COLUMNS, message_payload, user_payload
+from app.utils.responses import row_response
+from app.utils.chat_summary import (
+    MESSAGE_PREVIEW_LENGTH,
+    chat_messages_added,
+    members_messages_added,
+    record_messages_added,
+    record_message_edited,
+    record_message_deleted
+)
 
 router = APIRouter(prefix="/chats/{chat_id}/messages", tags=["chat-messages"])
 
+# Rows fetched per server-side cursor round-trip (and encoded per chunk) when exporting
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["id", "chatId", "userId", "message", "createdAt", "updatedAt"]
 
-@router.get("", response_model=List[ChatMessageResponse])
+
+async def _load_message(db: AsyncSession, chat_id: int, message_id: int):
+    """Load a message with its sender (and sender credential) eagerly loaded"""
+    result = await db.execute(
+        select(ChatMessage)
+        .options(
+            joinedload(ChatMessage.sender).joinedload(User.credential)  # Eager load sender and credential
+        )
+        .where(ChatMessage.id == message_id, ChatMessage.chatId == chat_id)
+    )
+    return result.scalars().first()
+
+
+def _publish_message(event_type: str, db_message: ChatMessage):
+    """Push a message event to the chat's realtime subscribers"""
+    chat_hub.publish(db_message.chatId, {
+        "type": event_type,
+        "chatId": db_message.chatId,
+        "message": ChatMessageResponse.model_validate(db_message).model_dump(mode="json")
+    })
+
+
+@router.get("", response_model=ChatMessageListResponse)
 async def get_chat_messages(
     chat_id: int,
+    request: Request,
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=500),
+    compact: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all messages in a chat"""
-    # Optimized: Use exists() subquery instead of separate query
-    from sqlalchemy import exists
-    chat_exists = db.query(exists().where(Chat.id == chat_id)).scalar()
-    if not chat_exists:
+    """
+    Get messages in a chat (newest first)
+    Keyset pagination over (createdAt, id):
+    - X-Next-Cursor header -> pass as ?before= to load older messages
+    - X-Prev-Cursor header -> pass as ?after= to load newer messages
+    skip is kept for backward compatibility and ignored when a cursor is given
+    compact=true: {"messages": [...], "users": {id: {id, displayName}}} - each sender once per page
+    instead of a full sender (with credential) embedded in every message
+    ETag / If-None-Match supported (changes with any message create/edit/delete in the chat)
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+    
+    # The chat version row doubles as the existence check
+    version = await chat_version(db, chat_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Chat not found")
+    etag = make_etag(chat_id, request.url.query, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
-    # Optimized query with eager loading to prevent N+1 queries
-    from sqlalchemy.orm import joinedload
-    messages = (
-        db.query(ChatMessage)
-        .options(
-            joinedload(ChatMessage.sender).joinedload(User.credential)  # Eager load sender and credential
+    # Seeks on the (chatId, createdAt, id) index instead of scanning/discarding offset rows
+    # Rows go straight into the response shape (no ORM objects, no per-message model validation)
+    if compact:
+        # Sender display name only: narrow join on User, no Credential
+        query = select(*MESSAGE_COLUMNS, display_name).join(User, User.id == ChatMessage.userId)
+    else:
+        # Sender and credential in the same round-trip (one JOIN, no N+1)
+        query = (
+            select(*MESSAGE_COLUMNS, *USER_COLUMNS)
+            .join(User, User.id == ChatMessage.userId)
+            .outerjoin(Credential, Credential.userId == User.id)
+        )
+    query = query.where(ChatMessage.chatId == chat_id)
+    position = tuple_(ChatMessage.createdAt, ChatMessage.id)
+    if after:
+        query = (
+            query.where(position > tuple_(*decode_cursor(after)))
+            .order_by(ChatMessage.createdAt.asc(), ChatMessage.id.asc())
+        )
+    else:
+        if before:
+            query = query.where(position < tuple_(*decode_cursor(before)))
+        else:
+            query = query.offset(skip)
+        query = query.order_by(ChatMessage.createdAt.desc(), ChatMessage.id.desc())
+    
+    # Fetch one extra row to know whether another page exists
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after:
+        rows.reverse()
+    messages = [message_payload(row) for row in rows]
+    
+    if messages:
+        # Older messages exist if we paged forward from a cursor, or the backward page was full
+        if after or has_more:
+            response.headers["X-Next-Cursor"] = encode_cursor(messages[-1]["createdAt"], messages[-1]["id"])
+        response.headers["X-Prev-Cursor"] = encode_cursor(messages[0]["createdAt"], messages[0]["id"])
+    if compact:
+        users = {row.userId: user_brief(row.userId, row.displayName) for row in rows}
+        return row_response({"messages": messages, "users": users}, response)
+    for message, row in zip(messages, rows):
+        message["sender"] = user_payload(row, len(MESSAGE_COLUMNS))
+    return row_response(messages, response)
+
+
+@router.get("/search", response_model=List[ChatMessageSearchResult])
+async def search_chat_messages(
+    chat_id: int,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search in one chat, best matches first (members only)
+    q uses web search syntax: words, "quoted phrases", OR, -excluded
+    Words are split on spaces and punctuation: Thai text is not segmented, so Thai terms only
+    match whole space-separated runs of Thai text
+    X-Next-Cursor header -> pass as ?cursor= for the next page
+    """
+    membership = await db.scalar(
+        select(
+            exists().where(
+                (chat_users.c.chatId == chat_id) &
+                (chat_users.c.userId == current_user.id)
+            )
         )
-        .filter(ChatMessage.chatId == chat_id)
-        .order_by(ChatMessage.createdAt.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
     )
-    return messages
+    if not membership:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    
+    rows, next_cursor = await search_messages(db, q, ChatMessage.chatId == chat_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 
-@router.get("/{message_id}", response_model=ChatMessageResponse)
-async def get_chat_message(chat_id: int, message_id: int, db: Session = Depends(get_db)):
-    """Get message by ID"""
-    from sqlalchemy.orm import joinedload
-    message = (
-        db.query(ChatMessage)
-        .options(
-            joinedload(ChatMessage.sender).joinedload(User.credential)  # Eager load sender and credential
+async def _export_chunks(chat_id: int, export_format: str) -> AsyncGenerator[str, None]:
+    """Encode the whole chat history chunk by chunk, oldest first (constant memory)"""
+    # Own session: the stream outlives the request handler (and its dependencies)
+    async with AsyncSessionLocal() as db:
+        table = ChatMessage.__table__
+        result = await db.stream(
+            select(*(table.c[name] for name in EXPORT_COLUMNS))
+            .where(table.c.chatId == chat_id)
+            .order_by(table.c.createdAt.asc(), table.c.id.asc())
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)  # Server-side cursor
+        )
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in result.partitions():
+                writer.writerows(
+                    (row.id, row.chatId, row.userId, row.message, row.createdAt.isoformat(), row.updatedAt.isoformat())
+                    for row in rows
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()  # Header only, for an empty chat
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps({
+                        "id": row.id,
+                        "chatId": row.chatId,
+                        "userId": row.userId,
+                        "message": row.message,
+                        "createdAt": row.createdAt.isoformat(),
+                        "updatedAt": row.updatedAt.isoformat()
+                    }, ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+
+
+async def _gzip_chunks(chunks: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
+    """Gzip a text stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_chat_messages(
+    chat_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    compress: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Export the full chat history (oldest first) as NDJSON or CSV (members only)
+    Streamed from a server-side cursor, so memory use doesn't grow with the chat size
+    compress=true gzips the stream on the fly (Content-Encoding: gzip)
+    """
+    membership = await db.scalar(
+        select(
+            exists().where(
+                (chat_users.c.chatId == chat_id) &
+                (chat_users.c.userId == current_user.id)
+            )
         )
-        .filter(ChatMessage.id == message_id, ChatMessage.chatId == chat_id)
-        .first()
     )
+    if not membership:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="chat-{chat_id}-messages.{format}"'}
+    body = _export_chunks(chat_id, format)
+    if compress:
+        headers["Content-Encoding"] = "gzip"  # Also keeps GZipMiddleware from compressing it again
+        body = _gzip_chunks(body)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@router.get("/{message_id}", response_model=ChatMessageResponse)
+async def get_chat_message(chat_id: int, message_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get message by ID"""
+    message = await _load_message(db, chat_id, message_id)
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     return message
@@ -65,48 +281,147 @@ async def create_chat_message(
     chat_id: int,
     message: ChatMessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create a new message in chat"""
-    # Optimized: Check membership with single query instead of loading all users
-    from sqlalchemy import exists
-    from app.models import chat_users
+    """
+    Create a new message in chat
+    One round-trip: a single CTE statement checks membership, inserts the message and
+    updates the chat summary and members' unread counters
+    """
+    from datetime import datetime
+    now = datetime.now()
+    table = ChatMessage.__table__
     
-    chat_exists = db.query(exists().where(Chat.id == chat_id)).scalar()
-    if not chat_exists:
+    is_member = exists().where(
+        (chat_users.c.chatId == chat_id) &
+        (chat_users.c.userId == current_user.id)
+    )
+    inserted = (
+        table.insert()
+        .from_select(
+            ["chatId", "userId", "message", "updatedAt"],
+            select(
+                literal(chat_id),
+                literal(current_user.id),
+                literal(message.message),
+                literal(now, DateTime(timezone=True))
+            ).where(is_member)
+        )
+        .returning(table.c.id, table.c.chatId, table.c.userId, table.c.message, table.c.createdAt, table.c.updatedAt)
+        .cte("inserted")
+    )
+    # Both UPDATEs join the inserted CTE, so they are no-ops when nothing was inserted
+    chat_summary = chat_messages_added(
+        inserted.c.chatId,
+        1,
+        inserted.c.id,
+        inserted.c.userId,
+        func.left(inserted.c.message, MESSAGE_PREVIEW_LENGTH),
+        inserted.c.createdAt,
+        now
+    ).cte("chat_summary")
+    member_state = members_messages_added(inserted.c.chatId, current_user.id, 1, inserted.c.id).cte("member_state")
+    
+    result = await db.execute(select(inserted).add_cte(chat_summary, member_state))
+    row = result.first()
+    if row is None:
+        # Nothing inserted: find out why (only on the error path)
+        chat_exists = await db.scalar(select(exists().where(Chat.id == chat_id)))
+        if not chat_exists:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        raise HTTPException(status_code=403, detail="User is not a member of this chat")
+    await db.commit()
+    
+    db_message = ChatMessage(**row._mapping)
+    # Sender is the current user (already loaded with credential); set without change events
+    set_committed_value(db_message, "sender", current_user)
+    _publish_message("message.created", db_message)
+    return db_message
+
+
+@router.post(":batch", response_model=List[ChatMessageResponse], status_code=201)
+async def create_chat_messages_batch(
+    chat_id: int,
+    batch: ChatMessageBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Import many messages into a chat at once (e.g. conversation backlogs from bot integrations)
+    Membership is checked once, rows are inserted with multi-row INSERT ... RETURNING
+    and the chat summary is updated once for the whole batch
+    Realtime subscribers get a single messages.batch_created event (fetch with ?after=)
+    
+    Each item may carry its original createdAt (items without one get the time of the import).
+    Timestamps must be in order, not in the future and not before the chat's newest message,
+    so history order (createdAt, id) matches insertion order.
+    Every message is attributed to the current user (no importing on behalf of other members).
+    """
+    # Lock the chat row first (the summary update takes it anyway): imports into one chat run one after another
+    # Prisma-migrated databases store lastMessageAt without a time zone: cast so the bound is aware
+    # (read in the session time zone, as PostgreSQL stores now() there) and compares with the items
+    chat = (await db.execute(
+        select(cast(Chat.lastMessageAt, DateTime(timezone=True)), func.now())
+        .where(Chat.id == chat_id)
+        .with_for_update()
+    )).first()
+    if chat is None:
         raise HTTPException(status_code=404, detail="Chat not found")
+    newest_at, import_at = chat
     
-    # Check membership efficiently
-    membership = db.query(
-        exists().where(
-            (chat_users.c.chatId == chat_id) & 
-            (chat_users.c.userId == current_user.id)
+    membership = await db.scalar(
+        select(
+            exists().where(
+                (chat_users.c.chatId == chat_id) &
+                (chat_users.c.userId == current_user.id)
+            )
         )
-    ).scalar()
-    
+    )
     if not membership:
         raise HTTPException(status_code=403, detail="User is not a member of this chat")
     
+    created_at = [item.createdAt or import_at for item in batch.messages]
+    previous_at = newest_at
+    for index, item_at in enumerate(created_at):
+        if item_at > import_at:
+            raise HTTPException(status_code=400, detail=f"messages[{index}].createdAt is in the future")
+        if previous_at is not None and item_at < previous_at:
+            raise HTTPException(
+                status_code=400,
+                detail=f"messages[{index}].createdAt is before the previous or the chat's newest message"
+            )
+        previous_at = item_at
+    
     from datetime import datetime
     now = datetime.now()
-    db_message = ChatMessage(
-        chatId=chat_id,
-        userId=current_user.id,
-        message=message.message,
-        updatedAt=now
+    table = ChatMessage.__table__
+    # Core insert: sent as multi-row VALUES pages (insertmanyvalues), rows come back in input order
+    result = await db.execute(
+        table.insert().returning(
+            table.c.id, table.c.chatId, table.c.userId, table.c.message, table.c.createdAt, table.c.updatedAt,
+            sort_by_parameter_order=True
+        ),
+        [
+            {
+                "chatId": chat_id, "userId": current_user.id, "message": item.message,
+                "createdAt": item_at, "updatedAt": now
+            }
+            for item, item_at in zip(batch.messages, created_at)
+        ]
     )
-    db.add(db_message)
+    rows = result.all()
     
-    # Optimized: Update chat's lastUsed timestamp with single UPDATE query
-    db.execute(
-        Chat.__table__.update()
-        .where(Chat.id == chat_id)
-        .values(lastUsed=now, updatedAt=now)
-    )
+    await record_messages_added(db, chat_id, current_user.id, rows[-1], now, count=len(rows))
+    await db.commit()
     
-    db.commit()
-    db.refresh(db_message)
-    return db_message
+    chat_hub.publish(chat_id, {
+        "type": "messages.batch_created",
+        "chatId": chat_id,
+        "count": len(rows),
+        "firstMessageId": rows[0].id,
+        "lastMessageId": rows[-1].id
+    })
+    return rows
 
 
 @router.put("/{message_id}", response_model=ChatMessageResponse)
@@ -115,14 +430,10 @@ async def update_chat_message(
     message_id: int,
     message: ChatMessageUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update message (only sender can update)"""
-    db_message = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.id == message_id, ChatMessage.chatId == chat_id)
-        .first()
-    )
+    db_message = await _load_message(db, chat_id, message_id)
     if not db_message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -130,9 +441,11 @@ async def update_chat_message(
     if db_message.userId != current_user.id:
         raise HTTPException(status_code=403, detail="Only message sender can update")
     
+    from datetime import datetime
     db_message.message = message.message
-    db.commit()
-    db.refresh(db_message)
+    await record_message_edited(db, db_message, datetime.now())
+    await db.commit()
+    _publish_message("message.updated", db_message)
     return db_message
 
 
@@ -141,14 +454,14 @@ async def delete_chat_message(
     chat_id: int,
     message_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete message (only sender can delete)"""
-    db_message = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.id == message_id, ChatMessage.chatId == chat_id)
-        .first()
+    result = await db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.id == message_id, ChatMessage.chatId == chat_id)
     )
+    db_message = result.scalars().first()
     if not db_message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -156,6 +469,68 @@ async def delete_chat_message(
     if db_message.userId != current_user.id:
         raise HTTPException(status_code=403, detail="Only message sender can delete")
     
-    db.delete(db_message)
-    db.commit()
+    await db.delete(db_message)
+    await db.flush()
+    await record_message_deleted(db, db_message)
+    await db.commit()
+    chat_hub.publish(chat_id, {"type": "message.deleted", "chatId": chat_id, "messageId": message_id})
     return {"message": "Message deleted successfully"}
+
+
+@router.websocket("/ws")
+async def chat_messages_websocket(websocket: WebSocket, chat_id: int, token: Optional[str] = None):
+    """
+    Realtime message events for a chat: message.created / message.updated / message.deleted
+    Authenticate with ?token=<JWT>; only chat members can connect
+    On (re)connect, fetch anything missed once with GET /chats/{chat_id}/messages?after=<cursor>
+    """
+    # Short-lived session: don't hold a pooled connection for the lifetime of the socket
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await authenticate_token(token or "", db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        membership = await db.scalar(
+            select(
+                exists().where(
+                    (chat_users.c.chatId == chat_id) &
+                    (chat_users.c.userId == user.id)
+                )
+            )
+        )
+    if not membership:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = chat_hub.subscribe(chat_id)
+    
+    async def send_events():
+        while True:
+            data = await queue.get()
+            if data is None:
+                # Fell too far behind - client must reconnect and resync
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_text(data)
+    
+    async def receive_until_disconnect():
+        # Client frames are ignored; receiving is how disconnects are detected
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+    
+    tasks = {asyncio.create_task(send_events()), asyncio.create_task(receive_until_disconnect())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # Sending to a socket that just closed is expected, not an error
+            if not task.cancelled():
+                task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        chat_hub.unsubscribe(chat_id, queue)
@@ -1,46 +1,236 @@
 """
 Chat routes
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
 
-from app.database import get_db
-from app.models import Chat, User, chat_users
-from app.schemas.chat import ChatCreate, ChatUpdate, ChatResponse, ChatUserCreate, ChatUserUpdate
+from app.database import get_async_db
+from app.models import Chat, ChatMessage, User, Credential, chat_users
+from app.schemas.chat import (
+    ChatCreate,
+    ChatUpdate,
+    ChatResponse,
+    ChatListResponse,
+    ChatDetailResponse,
+    ChatSummaryResponse,
+    ChatMarkRead,
+    ChatReadStateResponse,
+    ChatUserCreate,
+    ChatUserUpdate
+)
 from app.dependencies import get_current_user
+from app.schemas.chat_message import ChatMessageSearchResult
+from app.utils.chat_summary import mark_read
+from app.utils.message_search import search_messages
+from app.utils.etag import make_etag, etag_matches, set_etag, not_modified, chat_version, chat_list_version
+from app.utils.user_briefs import chat_member_briefs
+from app.utils.row_payloads import CHAT_COLUMNS, chat_payload, chat_member_payloads
+from app.utils.responses import row_response
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 
-@router.get("", response_model=List[ChatResponse])
+async def _load_chat(db: AsyncSession, chat_id: int):
+    """Load a chat with its users (and their credentials) eagerly loaded"""
+    result = await db.execute(
+        select(Chat)
+        .options(selectinload(Chat.users).selectinload(User.credential))
+        .where(Chat.id == chat_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def _touch_chat(db: AsyncSession, chat_id: int):
+    """Bump the chat's updatedAt after a membership change (changes its ETag, not the list order)"""
+    from datetime import datetime
+    await db.execute(
+        Chat.__table__.update()
+        .where(Chat.id == chat_id)
+        .values(updatedAt=datetime.now(), lastUsed=Chat.lastUsed)
+    )
+
+
+async def _is_member(db: AsyncSession, chat_id: int, user_id: int) -> bool:
+    """Check chat membership with a single EXISTS query"""
+    return await db.scalar(
+        select(
+            exists().where(
+                (chat_users.c.chatId == chat_id) & (chat_users.c.userId == user_id)
+            )
+        )
+    )
+
+
+@router.get("", response_model=ChatListResponse)
 async def get_chats(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    compact: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all chats for current user"""
-    # Optimized query with eager loading to prevent N+1 queries
-    # Use distinct() to avoid duplicate rows from join
-    chats = (
-        db.query(Chat)
-        .join(chat_users)
-        .filter(chat_users.c.userId == current_user.id)
-        .options(joinedload(Chat.users))  # Eager load users to prevent N+1 queries
+    """
+    Get all chats for current user (ETag / If-None-Match supported)
+    compact=true: {"chats": [... "userIds": [...]], "users": {id: {id, displayName}}}
+    instead of full member objects (with credentials) repeated in every chat
+    """
+    # One aggregate query decides whether anything in the list changed
+    etag = make_etag(current_user.id, skip, limit, compact, *await chat_list_version(db, current_user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    # Rows straight into the response shape (no ORM objects, no per-chat model validation)
+    result = await db.execute(
+        select(*CHAT_COLUMNS)
+        .join(chat_users, chat_users.c.chatId == Chat.id)
+        .where(chat_users.c.userId == current_user.id)
         .order_by(Chat.lastUsed.desc())
         .offset(skip)
         .limit(limit)
-        .distinct()
-        .all()
     )
-    return chats
+    chats = [chat_payload(row) for row in result]
+    chat_ids = [chat["id"] for chat in chats]
+    if compact:
+        member_ids, users = await chat_member_briefs(db, chat_ids)
+        for chat in chats:
+            chat["userIds"] = member_ids[chat["id"]]
+        return row_response({"chats": chats, "users": users}, response)
+    
+    # Members of every chat in one extra query (like selectinload, without building User objects)
+    members = await chat_member_payloads(db, chat_ids)
+    for chat in chats:
+        chat["users"] = members[chat["id"]]
+    return row_response(chats, response)
+
+
+@router.get("/summary", response_model=List[ChatSummaryResponse])
+async def get_chat_summaries(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the chat list for the current user (lean mode for sidebars)
+    One query: chat columns, member count, unread count and last message preview; no member objects
+    Last message and unread counts come from the denormalised summary columns
+    """
+    # Separate alias: the outer query also reads ChatUser (for the current user's read state)
+    members = chat_users.alias("members")
+    member_count = (
+        select(func.count())
+        .select_from(members)
+        .where(members.c.chatId == Chat.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            Chat.id,
+            Chat.name,
+            Chat.createdAt,
+            Chat.updatedAt,
+            Chat.lastUsed,
+            Chat.messageCount,
+            Chat.lastMessageId,
+            Chat.lastMessageUserId,
+            Chat.lastMessagePreview,
+            Chat.lastMessageAt,
+            chat_users.c.role,
+            chat_users.c.unreadCount,
+            chat_users.c.lastReadMessageId,
+            member_count.label("memberCount")
+        )
+        .select_from(chat_users)
+        .join(Chat, Chat.id == chat_users.c.chatId)
+        .where(chat_users.c.userId == current_user.id)
+        .order_by(Chat.lastUsed.desc(), Chat.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    
+    # Rows are already in response shape: render directly instead of validating models
+    chats = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "createdAt": row.createdAt,
+            "updatedAt": row.updatedAt,
+            "lastUsed": row.lastUsed,
+            "role": row.role,
+            "memberCount": row.memberCount,
+            "messageCount": row.messageCount,
+            "unreadCount": row.unreadCount,
+            "lastReadMessageId": row.lastReadMessageId,
+            "lastMessage": None if row.lastMessageId is None else {
+                "id": row.lastMessageId,
+                "userId": row.lastMessageUserId,
+                "preview": row.lastMessagePreview,
+                "createdAt": row.lastMessageAt
+            }
+        }
+        for row in result
+    ]
+    return row_response(chats)
 
 
-@router.get("/{chat_id}", response_model=ChatResponse)
-async def get_chat(chat_id: int, db: Session = Depends(get_db)):
-    """Get chat by ID"""
-    chat = db.query(Chat).filter(Chat.id == chat_id).first()
+@router.get("/messages/search", response_model=List[ChatMessageSearchResult])
+async def search_all_chat_messages(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search across all chats of the current user, best matches first
+    q uses web search syntax: words, "quoted phrases", OR, -excluded
+    Words are split on spaces and punctuation: Thai text is not segmented, so Thai terms only
+    match whole space-separated runs of Thai text
+    X-Next-Cursor header -> pass as ?cursor= for the next page
+    """
+    my_chats = select(chat_users.c.chatId).where(chat_users.c.userId == current_user.id)
+    rows, next_cursor = await search_messages(db, q, ChatMessage.chatId.in_(my_chats), limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@router.get("/{chat_id}", response_model=ChatDetailResponse)
+async def get_chat(
+    chat_id: int,
+    request: Request,
+    response: Response,
+    compact: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get chat by ID (ETag / If-None-Match supported)
+    compact=true: member ids plus a {id: {id, displayName}} users map instead of full member objects
+    """
+    version = await chat_version(db, chat_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    etag = make_etag(chat_id, compact, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    if compact:
+        row = (await db.execute(select(*CHAT_COLUMNS).where(Chat.id == chat_id))).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        member_ids, users = await chat_member_briefs(db, [chat_id])
+        return row_response({**chat_payload(row), "userIds": member_ids[chat_id], "users": users}, response)
+    
+    chat = await _load_chat(db, chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     return chat
@@ -50,162 +240,180 @@ async def get_chat(chat_id: int, db: Session = Depends(get_db)):
 async def create_chat(
     chat: ChatCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new chat"""
     from datetime import datetime
     now = datetime.now()
-    db_chat = Chat(name=chat.name, createdAt=now, updatedAt=now, lastUsed=now)
-    db.add(db_chat)
-    db.flush()  # Get the chat ID
     
     # Add current user to chat
-    db_chat.users.append(current_user)
+    members = [current_user]
     
     # Add other users to chat - optimized: bulk query instead of loop
     if chat.user_ids:
         # Filter out current user and get all users in one query
         user_ids_to_add = [uid for uid in chat.user_ids if uid != current_user.id]
         if user_ids_to_add:
-            users_to_add = db.query(User).filter(User.id.in_(user_ids_to_add)).all()
+            result = await db.execute(
+                select(User)
+                .options(selectinload(User.credential))
+                .where(User.id.in_(user_ids_to_add))
+            )
+            users_to_add = result.scalars().all()
             if len(users_to_add) != len(user_ids_to_add):
                 found_ids = {u.id for u in users_to_add}
                 missing_ids = set(user_ids_to_add) - found_ids
                 raise HTTPException(status_code=404, detail=f"Users not found: {list(missing_ids)}")
-            db_chat.users.extend(users_to_add)
+            members.extend(users_to_add)
     
-    db.commit()
-    db.refresh(db_chat)
+    db_chat = Chat(name=chat.name, createdAt=now, updatedAt=now, lastUsed=now, users=members)
+    db.add(db_chat)
+    await db.commit()
     return db_chat
 
 
 @router.put("/{chat_id}", response_model=ChatResponse)
-async def update_chat(chat_id: int, chat: ChatUpdate, db: Session = Depends(get_db)):
+async def update_chat(chat_id: int, chat: ChatUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
+    db_chat = await _load_chat(db, chat_id)
     if not db_chat:
         raise HTTPException(status_code=404, detail="Chat not found")
     
     if chat.name is not None:
         db_chat.name = chat.name
     
-    db.commit()
-    db.refresh(db_chat)
+    await db.commit()
     return db_chat
 
 
 @router.delete("/{chat_id}")
-async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
+async def delete_chat(chat_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
-    if not db_chat:
+    # Let the database cascade (ChatUser / ChatMessage use ON DELETE CASCADE)
+    # instead of loading every message into the session first
+    result = await db.execute(Chat.__table__.delete().where(Chat.id == chat_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Chat not found")
-    
-    db.delete(db_chat)
-    db.commit()
+    await db.commit()
     return {"message": "Chat deleted successfully"}
 
 
 @router.post("/{chat_id}/users", response_model=ChatResponse)
-async def add_user_to_chat(chat_id: int, chat_user: ChatUserCreate, db: Session = Depends(get_db)):
+async def add_user_to_chat(chat_id: int, chat_user: ChatUserCreate, db: AsyncSession = Depends(get_async_db)):
     """Add user to chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
-    if not db_chat:
+    chat_exists = await db.scalar(select(exists().where(Chat.id == chat_id)))
+    if not chat_exists:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    user = db.query(User).filter(User.id == chat_user.userId).first()
-    if not user:
+    user_exists = await db.scalar(select(exists().where(User.id == chat_user.userId)))
+    if not user_exists:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if user already in chat
-    if user in db_chat.users:
+    if await _is_member(db, chat_id, chat_user.userId):
         raise HTTPException(status_code=400, detail="User already in chat")
     
-    # Add user to chat with role
-    db_chat.users.append(user)
-    
-    # Update role in junction table
-    stmt = chat_users.update().where(
-        (chat_users.c.chatId == chat_id) & (chat_users.c.userId == chat_user.userId)
-    ).values(role=chat_user.role)
-    db.execute(stmt)
+    # Add user to chat with role (single INSERT into junction table)
+    await db.execute(
+        chat_users.insert().values(chatId=chat_id, userId=chat_user.userId, role=chat_user.role)
+    )
+    await _touch_chat(db, chat_id)
     
-    db.commit()
-    db.refresh(db_chat)
-    return db_chat
+    await db.commit()
+    return await _load_chat(db, chat_id)
 
 
 @router.put("/{chat_id}/users/{user_id}", response_model=ChatResponse)
 async def update_user_role_in_chat(
-    chat_id: int, 
-    user_id: int, 
-    chat_user: ChatUserUpdate, 
-    db: Session = Depends(get_db)
+    chat_id: int,
+    user_id: int,
+    chat_user: ChatUserUpdate,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user role in chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
-    if not db_chat:
+    chat_exists = await db.scalar(select(exists().where(Chat.id == chat_id)))
+    if not chat_exists:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user_exists = await db.scalar(select(exists().where(User.id == user_id)))
+    if not user_exists:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if user not in db_chat.users:
+    if not await _is_member(db, chat_id, user_id):
         raise HTTPException(status_code=404, detail="User not in chat")
     
     # Update role in junction table
     stmt = chat_users.update().where(
         (chat_users.c.chatId == chat_id) & (chat_users.c.userId == user_id)
     ).values(role=chat_user.role)
-    db.execute(stmt)
+    await db.execute(stmt)
+    await _touch_chat(db, chat_id)
     
-    db.commit()
-    db.refresh(db_chat)
-    return db_chat
+    await db.commit()
+    return await _load_chat(db, chat_id)
 
 
 @router.delete("/{chat_id}/users/{user_id}", response_model=ChatResponse)
-async def remove_user_from_chat(chat_id: int, user_id: int, db: Session = Depends(get_db)):
+async def remove_user_from_chat(chat_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Remove user from chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
-    if not db_chat:
+    chat_exists = await db.scalar(select(exists().where(Chat.id == chat_id)))
+    if not chat_exists:
         raise HTTPException(status_code=404, detail="Chat not found")
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user_exists = await db.scalar(select(exists().where(User.id == user_id)))
+    if not user_exists:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if user not in db_chat.users:
+    if not await _is_member(db, chat_id, user_id):
         raise HTTPException(status_code=404, detail="User not in chat")
     
-    db_chat.users.remove(user)
-    db.commit()
-    db.refresh(db_chat)
-    return db_chat
+    await db.execute(
+        chat_users.delete().where(
+            (chat_users.c.chatId == chat_id) & (chat_users.c.userId == user_id)
+        )
+    )
+    await _touch_chat(db, chat_id)
+    await db.commit()
+    return await _load_chat(db, chat_id)
+
+
+@router.post("/{chat_id}/read", response_model=ChatReadStateResponse)
+async def mark_chat_read(
+    chat_id: int,
+    read: Optional[ChatMarkRead] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mark the chat read for the current user (up to messageId, or everything if omitted)"""
+    state = await mark_read(db, chat_id, current_user.id, read.messageId if read else None)
+    if state is None:
+        raise HTTPException(status_code=404, detail="User not in chat")
+    await db.commit()
+    return {"chatId": chat_id, "lastReadMessageId": state.lastReadMessageId, "unreadCount": state.unreadCount}
 
 
 @router.get("/{chat_id}/users", response_model=List[dict])
-async def get_chat_users(chat_id: int, db: Session = Depends(get_db)):
+async def get_chat_users(chat_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all users in a chat"""
-    db_chat = db.query(Chat).filter(Chat.id == chat_id).first()
-    if not db_chat:
+    chat_exists = await db.scalar(select(exists().where(Chat.id == chat_id)))
+    if not chat_exists:
         raise HTTPException(status_code=404, detail="Chat not found")
     
     # Optimized: Use single query with join instead of N+1 queries
-    from sqlalchemy import select
-    result = db.execute(
+    # Username lives on Credential (users without a password yet have none)
+    result = await db.execute(
         select(
             User.id,
-            User.username,
+            Credential.username,
             User.email,
             chat_users.c.role,
             chat_users.c.joinedAt
         )
         .select_from(chat_users)
         .join(User, chat_users.c.userId == User.id)
+        .outerjoin(Credential, Credential.userId == User.id)
         .where(chat_users.c.chatId == chat_id)
-    ).fetchall()
+    )
     
     # Convert to list of dicts
     users_data = [
@@ -2,10 +2,11 @@
 Credential routes - Authentication credentials management (separated for security)
 """
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, Credential
 from app.schemas.credential import (
     CredentialCreate, 
@@ -16,17 +17,29 @@ from app.schemas.credential import (
 )
 from app.dependencies import get_current_user
 from app.utils.password import hash_password, verify_password
+from app.utils.auth_cache import principal_cache
 
 router = APIRouter(prefix="/credentials", tags=["credentials"])
 
 
+async def _get_credential(db: AsyncSession, user_id: int):
+    """Get credential for a user (fresh from the database, not the cached principal's copy)"""
+    result = await db.execute(
+        select(Credential)
+        .where(Credential.userId == user_id)
+        # get_current_user merges the cached credential into the session; refresh it from the row
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
 @router.get("/me", response_model=CredentialResponse)
 async def get_my_credential(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's credential"""
-    credential = db.query(Credential).filter(Credential.userId == current_user.id).first()
+    credential = await _get_credential(db, current_user.id)
     if not credential:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -39,10 +52,10 @@ async def get_my_credential(
 async def update_my_credential(
     credential: CredentialUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user's credential"""
-    db_credential = db.query(Credential).filter(Credential.userId == current_user.id).first()
+    db_credential = await _get_credential(db, current_user.id)
     
     if not db_credential:
         raise HTTPException(
@@ -53,10 +66,12 @@ async def update_my_credential(
     # Update username
     if credential.username is not None:
         # Check if username already exists (excluding current user)
-        existing_credential = db.query(Credential).filter(
-            Credential.username == credential.username,
-            Credential.userId != current_user.id
-        ).first()
+        existing_credential = await db.scalar(
+            select(Credential).where(
+                Credential.username == credential.username,
+                Credential.userId != current_user.id
+            )
+        )
         if existing_credential:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -70,8 +85,8 @@ async def update_my_credential(
         db_credential.password = await hash_password(credential.password)
     
     db_credential.updatedAt = datetime.now()
-    db.commit()
-    db.refresh(db_credential)
+    await db.commit()
+    principal_cache.invalidate(current_user.email)
     return db_credential
 
 
@@ -79,7 +94,7 @@ async def update_my_credential(
 async def change_password(
     password_data: ChangePasswordRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Change password - requires old password verification
@@ -90,7 +105,7 @@ async def change_password(
     - New password (minimum 6 characters)
     """
     # Get current user's credential
-    db_credential = db.query(Credential).filter(Credential.userId == current_user.id).first()
+    db_credential = await _get_credential(db, current_user.id)
     
     if not db_credential:
         raise HTTPException(
@@ -120,7 +135,8 @@ async def change_password(
     # Update password
     db_credential.password = hashed_new_password
     db_credential.updatedAt = datetime.now()
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(current_user.email)
     
     return ChangePasswordResponse(
         message="Password changed successfully",
@@ -131,16 +147,17 @@ async def change_password(
 @router.delete("/me")
 async def delete_my_credential(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete current user's credential (this will prevent login)"""
-    db_credential = db.query(Credential).filter(Credential.userId == current_user.id).first()
+    db_credential = await _get_credential(db, current_user.id)
     if not db_credential:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Credential not found"
         )
     
-    db.delete(db_credential)
-    db.commit()
+    await db.delete(db_credential)
+    await db.commit()
+    principal_cache.invalidate(current_user.email)
     return {"message": "Credential deleted successfully"}
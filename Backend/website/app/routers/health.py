@@ -2,19 +2,22 @@
 Health check routes
 """
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.database import get_db
+from app.database import get_async_db
+from app.utils.jwt import get_token_cache_stats
+from app.utils.auth_cache import principal_cache
+from app.utils.password import get_password_pool_stats
 
 router = APIRouter(tags=["health"])
 
 
-def check_database_connection(db: Session):
+async def check_database_connection(db: AsyncSession):
     """Check if database connection is working"""
     try:
         # Test query using SQLAlchemy
-        result = db.execute(text("SELECT version(), current_database()"))
+        result = await db.execute(text("SELECT version(), current_database()"))
         version, db_name = result.fetchone()
         
         return {
@@ -44,9 +47,24 @@ async def health_check():
 
 
 @router.get("/health/db")
-async def health_check_db(db: Session = Depends(get_db)):
+async def health_check_db(db: AsyncSession = Depends(get_async_db)):
     """Check database connection status"""
-    result = check_database_connection(db)
+    result = await check_database_connection(db)
     if not result["connected"]:
         raise HTTPException(status_code=503, detail=result)
     return result
+
+
+@router.get("/health/caches")
+async def health_check_caches():
+    """Auth cache sizes and hit/miss counters (for tuning cache sizes/TTLs)"""
+    return {
+        "jwt": get_token_cache_stats(),
+        "principals": principal_cache.stats()
+    }
+
+
+@router.get("/health/password-pool")
+async def health_check_password_pool():
+    """Password hashing pool depth, rejections and latency (admission control tuning)"""
+    return get_password_pool_stats()
@@ -4,14 +4,16 @@ Log streaming routes for realtime log viewing
 import asyncio
 import logging
 import sys
-import queue
-import threading
+from collections import deque
 from datetime import datetime
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 import json
 
+from app.utils.broadcast import broadcast
+from app.utils.log_store import log_store
+
 router = APIRouter(prefix="/logs", tags=["logs"])
 
 # Setup logger
@@ -27,56 +29,66 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
+# Broadcast channel carrying log entries (so viewers on any worker see logs from every worker)
+LOG_CHANNEL = "log_events"
+
+
+# Max log lines buffered per viewer; when a viewer falls behind the oldest lines are dropped
+SUBSCRIBER_BUFFER_SIZE = 1000
+
+
+class LogSubscriber:
+    """Per-viewer bounded ring buffer (drop-oldest when full)"""
+    __slots__ = ("buffer", "event", "dropped", "unreported_dropped")
+
+    def __init__(self, maxlen: int = SUBSCRIBER_BUFFER_SIZE):
+        self.buffer = deque(maxlen=maxlen)
+        self.event = asyncio.Event()
+        self.dropped = 0
+        self.unreported_dropped = 0
+
+    def push(self, data: str) -> bool:
+        """Append a log line; returns True if the oldest line had to be dropped"""
+        overflow = len(self.buffer) == self.buffer.maxlen
+        if overflow:
+            self.dropped += 1
+            self.unreported_dropped += 1
+        self.buffer.append(data)
+        self.event.set()
+        return overflow
+
+
 class LogStream:
-    """Log stream handler that captures logs and streams them"""
-    def __init__(self):
-        self.log_queue = asyncio.Queue()
-        self.sync_queue = queue.Queue()  # Thread-safe queue for sync logging
-        self.clients = set()
-        self._background_task = None
-        self._start_background_processor()
+    """Log stream that broadcasts every log line to every connected viewer"""
+    def __init__(self, buffer_size: int = SUBSCRIBER_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.subscribers = set()
+        self.dropped_total = 0  # Lines dropped across all viewers (slow consumers)
+        broadcast.subscribe(LOG_CHANNEL, self._on_broadcast)
     
-    def _start_background_processor(self):
-        """Start background thread to process sync queue"""
-        def process_queue():
-            # Create new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            async def process():
-                while True:
-                    try:
-                        # Get from sync queue (non-blocking)
-                        try:
-                            log_entry = self.sync_queue.get_nowait()
-                            # Put into async queue
-                            await self.log_queue.put(log_entry)
-                        except queue.Empty:
-                            await asyncio.sleep(0.1)
-                    except Exception as e:
-                        # Silently ignore errors to prevent recursion
-                        pass
-            
-            try:
-                loop.run_until_complete(process())
-            except Exception:
-                pass
-        
-        thread = threading.Thread(target=process_queue, daemon=True)
-        thread.start()
+    def _on_broadcast(self, data: str):
+        """Broadcast callback (runs in the app event loop): fan the JSON log entry out to every viewer"""
+        for subscriber in self.subscribers:
+            if subscriber.push(data):
+                self.dropped_total += 1
+    
+    def stats(self) -> dict:
+        """Viewer count and dropped-line counters"""
+        return {
+            "clients": len(self.subscribers),
+            "buffer_size": self.buffer_size,
+            "dropped_total": self.dropped_total
+        }
     
     def add_log_sync(self, level: str, message: str, source: str = "app"):
-        """Add a log entry synchronously (thread-safe)"""
+        """Add a log entry from any thread (handed to the event loop with call_soon_threadsafe)"""
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "level": level,
             "message": message,
             "source": source
         }
-        try:
-            self.sync_queue.put_nowait(log_entry)
-        except Exception:
-            pass  # Ignore if queue is full
+        broadcast.publish_threadsafe(LOG_CHANNEL, json.dumps(log_entry))
     
     async def add_log(self, level: str, message: str, source: str = "app"):
         """Add a log entry to the stream"""
@@ -86,23 +98,37 @@ class LogStream:
             "message": message,
             "source": source
         }
-        await self.log_queue.put(log_entry)
+        broadcast.publish(LOG_CHANNEL, json.dumps(log_entry))
     
     async def stream_logs(self) -> AsyncGenerator[str, None]:
-        """Stream logs as Server-Sent Events"""
+        """Stream logs as Server-Sent Events (every viewer receives every line)"""
+        subscriber = LogSubscriber(self.buffer_size)
+        self.subscribers.add(subscriber)
         try:
             while True:
-                # Wait for log entry with timeout
-                try:
-                    log_entry = await asyncio.wait_for(self.log_queue.get(), timeout=1.0)
-                    # Format as SSE
-                    data = json.dumps(log_entry)
-                    yield f"data: {data}\n\n"
-                except asyncio.TimeoutError:
-                    # Send heartbeat to keep connection alive
-                    yield ": heartbeat\n\n"
+                if not subscriber.buffer:
+                    # Wait for log entries with timeout
+                    try:
+                        await asyncio.wait_for(subscriber.event.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        # Send heartbeat to keep connection alive
+                        yield ": heartbeat\n\n"
+                        continue
+                subscriber.event.clear()
+                
+                chunk = []
+                if subscriber.unreported_dropped:
+                    # Tell the viewer how many lines it missed while it was behind
+                    chunk.append(f"event: dropped\ndata: {{\"dropped\": {subscriber.unreported_dropped}}}\n\n")
+                    subscriber.unreported_dropped = 0
+                # Entries arrive already JSON-encoded; send everything buffered in one write
+                while subscriber.buffer:
+                    chunk.append(f"data: {subscriber.buffer.popleft()}\n\n")
+                yield "".join(chunk)
         except asyncio.CancelledError:
             pass
+        finally:
+            self.subscribers.discard(subscriber)
 
 
 # Global log stream instance
@@ -119,14 +145,21 @@ class StreamLogHandler(logging.Handler):
             level = record.levelname
             source = record.name
             
-            # Use thread-safe sync method
+            # Keep it in the recent-logs store (served by /logs/recent)
+            log_store.append(record.created, record.levelno, level, source, message)
+            
+            # Don't stream the broadcast layer's own logs (publishing them could fail the same way again)
+            if source.startswith("app.broadcast"):
+                return
+            
+            # Thread-safe: hands the entry to the event loop via call_soon_threadsafe
             log_stream.add_log_sync(level=level, message=message, source=source)
         except Exception:
             # Ignore errors in log handler to prevent recursion
             pass
 
 
-# Add stream handler to root logger and app logger
+# Add stream handler to root logger
 stream_handler = StreamLogHandler()
 stream_handler.setFormatter(
     logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -139,9 +172,8 @@ if not any(isinstance(h, StreamLogHandler) for h in root_logger.handlers):
     root_logger.addHandler(stream_handler)
 root_logger.setLevel(logging.INFO)
 
-# Also add to app logger
-if not any(isinstance(h, StreamLogHandler) for h in logger.handlers):
-    logger.addHandler(stream_handler)
+# The app logger propagates to the root logger, so it must not get its own
+# StreamLogHandler (every app log line would be streamed twice)
 
 
 @router.get("/stream")
@@ -170,13 +202,46 @@ async def test_log(message: str = "Test log message"):
     return {"message": "Log entry created", "log": message}
 
 
+@router.get("/stats")
+async def get_log_stream_stats():
+    """Log stream viewer count and dropped-line counters"""
+    return log_stream.stats()
+
+
 @router.get("/recent")
-async def get_recent_logs(limit: int = 100):
-    """Get recent log entries (not realtime, just recent logs)"""
-    # This is a simple implementation
-    # In production, you might want to store logs in a database
+async def get_recent_logs(
+    limit: int = Query(100, ge=1, le=1000),
+    level: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    q: Optional[str] = None,
+    cursor: Optional[int] = None
+):
+    """
+    Get recent log entries, newest first (not realtime - use /logs/stream for that)
+    Filters:
+    - level: minimum level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+    - source: logger name prefix (e.g. "app", "uvicorn.error")
+    - since: only entries at or after this time (ISO 8601)
+    - q: case-insensitive substring of the message
+    Paging: pass next_cursor back as ?cursor= for older entries
+    """
+    min_level = logging.NOTSET
+    if level:
+        min_level = logging.getLevelName(level.upper())
+        if not isinstance(min_level, int):
+            raise HTTPException(status_code=400, detail=f"Unknown log level: {level}")
+    
+    entries, next_cursor = log_store.query(
+        limit=limit,
+        before=cursor,
+        min_level=min_level,
+        source=source,
+        since=since.timestamp() if since else None,
+        contains=q
+    )
     return {
-        "message": "Recent logs endpoint",
-        "note": "Use /logs/stream for realtime logs",
+        "logs": [entry.to_dict() for entry in entries],
+        "next_cursor": next_cursor,
         "limit": limit
     }
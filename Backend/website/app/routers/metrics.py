@@ -0,0 +1,131 @@
+"""
+Prometheus metrics route (admin only, or a static scrape token)
+"""
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine, async_engine, get_async_db
+from app.dependencies import security, authenticate_token
+from app.routers.logs import log_stream
+from app.utils.chat_hub import chat_hub
+from app.utils.jwt import get_token_cache_stats
+from app.utils.auth_cache import principal_cache
+from app.utils.password import get_password_pool_stats
+from app.utils.metrics import request_metrics, render_metric, render_gauge
+
+router = APIRouter(tags=["metrics"])
+
+# Bearer token for Prometheus scrapers (scrape config: authorization.credentials), compared in constant time;
+# admins can always read /metrics with their JWT. Unset: admin JWT only
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+async def require_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Allow the scrape token or an admin user's JWT"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if METRICS_TOKEN and secrets.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        return
+    user = await authenticate_token(credentials.credentials, db)
+    if user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+
+def _db_pool_lines() -> list:
+    """Connection pool gauges for both engines (size pool_size/max_overflow from these)"""
+    pools = {"sync": engine.pool, "async": async_engine.pool}
+    lines = render_metric(
+        "db_pool_size", "gauge", "Configured base pool size",
+        [({"engine": name}, pool.size()) for name, pool in pools.items()]
+    )
+    lines += render_metric(
+        "db_pool_checked_out", "gauge", "Connections currently in use",
+        [({"engine": name}, pool.checkedout()) for name, pool in pools.items()]
+    )
+    lines += render_metric(
+        "db_pool_checked_in", "gauge", "Idle connections in the pool",
+        [({"engine": name}, pool.checkedin()) for name, pool in pools.items()]
+    )
+    # overflow() is negative while the base pool isn't full
+    lines += render_metric(
+        "db_pool_overflow", "gauge", "Connections open beyond pool_size (max_overflow in use)",
+        [({"engine": name}, max(0, pool.overflow())) for name, pool in pools.items()]
+    )
+    return lines
+
+
+def _password_pool_lines() -> list:
+    stats = get_password_pool_stats()
+    labels = {"backend": stats["backend"]}
+    lines = render_gauge("password_pool_workers", "Password hashing workers", stats["workers"], labels)
+    lines += render_gauge("password_pool_max_queue", "Max waiting password operations before 503", stats["max_queue"], labels)
+    lines += render_gauge("password_pool_in_flight", "Password operations running or waiting", stats["in_flight"], labels)
+    lines += render_gauge("password_pool_queued", "Password operations waiting for a worker", stats["queued"], labels)
+    lines += render_metric(
+        "password_pool_completed_total", "counter", "Password operations completed", [(labels, stats["completed"])]
+    )
+    lines += render_metric(
+        "password_pool_rejected_total", "counter", "Password operations rejected with 503", [(labels, stats["rejected"])]
+    )
+    lines += render_gauge(
+        "password_pool_run_seconds", "Moving average time a password operation runs", stats["avg_run_ms"] / 1000, labels
+    )
+    lines += render_gauge(
+        "password_pool_wait_seconds", "Moving average time a password operation waits", stats["avg_wait_ms"] / 1000, labels
+    )
+    return lines
+
+
+def _realtime_lines() -> list:
+    log_stats = log_stream.stats()
+    lines = render_gauge("log_stream_clients", "Connected /logs/stream (SSE) viewers", log_stats["clients"])
+    lines += render_metric(
+        "log_stream_dropped_total", "counter", "Log lines dropped for slow SSE viewers", [({}, log_stats["dropped_total"])]
+    )
+    lines += render_gauge("chat_websocket_connections", "Open chat WebSocket connections", chat_hub.connection_count())
+    return lines
+
+
+def _cache_lines() -> list:
+    caches = {"jwt": get_token_cache_stats(), "principals": principal_cache.stats()}
+    lines = render_metric(
+        "auth_cache_size", "gauge", "Entries in the auth caches",
+        [({"cache": name}, stats["size"]) for name, stats in caches.items()]
+    )
+    lines += render_metric(
+        "auth_cache_hits_total", "counter", "Auth cache hits",
+        [({"cache": name}, stats["hits"]) for name, stats in caches.items()]
+    )
+    lines += render_metric(
+        "auth_cache_misses_total", "counter", "Auth cache misses",
+        [({"cache": name}, stats["misses"]) for name, stats in caches.items()]
+    )
+    return lines
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_access)]
+)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    lines = _db_pool_lines() + _password_pool_lines() + _realtime_lines() + _cache_lines()
+    return PlainTextResponse(
+        request_metrics.render() + "\n".join(lines) + "\n",
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
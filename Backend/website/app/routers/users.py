@@ -1,52 +1,72 @@
 """
 User routes - User information and profile
 """
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List
 from datetime import datetime
 
-from app.database import get_db
-from app.models import User, Credential
+from app.database import get_async_db
+from app.models import User, Credential, Chat, ChatMessage
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserRegister, RegisterResponse
 from app.utils.password import hash_password
 from app.dependencies import get_current_user, get_current_admin_user
+from app.utils.auth_cache import principal_cache
+from app.utils.etag import make_etag, etag_matches, set_etag, not_modified, user_version
+from app.utils.row_payloads import USER_COLUMNS, user_payload
+from app.utils.responses import row_response
+from app.utils.chat_summary import recompute_chat_summaries
 import secrets
 import string
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+async def _load_user(db: AsyncSession, user_id: int):
+    """Load a user with credential eagerly loaded (required by UserResponse)"""
+    result = await db.execute(
+        select(User)
+        .options(joinedload(User.credential))
+        .where(User.id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
 @router.get("", response_model=List[UserResponse])
-async def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """Get all users"""
-    # Eager load credential to avoid N+1 queries
-    users = (
-        db.query(User)
-        .options(joinedload(User.credential))
+    # Credential in the same query; rows go straight into the response shape (no per-user model validation)
+    result = await db.execute(
+        select(*USER_COLUMNS)
+        .outerjoin(Credential, Credential.userId == User.id)
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    return users
+    return row_response([user_payload(row) for row in result])
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID"""
+async def get_user(user_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Get user by ID (ETag / If-None-Match supported)"""
+    version = await user_version(db, user_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    etag = make_etag(user_id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     # Eager load credential
-    user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == user_id)
-        .first()
-    )
+    user = await _load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
 
-def generate_username_from_email(email: str, db: Session) -> str:
+async def generate_username_from_email(email: str, db: AsyncSession) -> str:
     """Generate a unique username from email"""
     base_username = email.split('@')[0].lower()
     # Remove special characters, keep only alphanumeric
@@ -55,7 +75,7 @@ def generate_username_from_email(email: str, db: Session) -> str:
     # Check if username exists, if so append numbers
     username = base_username
     counter = 1
-    while db.query(Credential).filter(Credential.username == username).first():
+    while await db.scalar(select(Credential.id).where(Credential.username == username)):
         username = f"{base_username}{counter}"
         counter += 1
     
@@ -69,15 +89,15 @@ def generate_temp_password() -> str:
 
 
 @router.post("", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user with credential and profile"""
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
     # Check if username already exists
-    existing_credential = db.query(Credential).filter(Credential.username == user.username).first()
+    existing_credential = await db.scalar(select(Credential.id).where(Credential.username == user.username))
     if existing_credential:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
     
@@ -94,7 +114,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         updatedAt=now
     )
     db.add(db_user)
-    db.flush()  # Get user ID
+    await db.flush()  # Get user ID
     
     # Create credential (authentication info)
     db_credential = Credential(
@@ -106,20 +126,13 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     db.add(db_credential)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     # Eager load credential for response
-    db_user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == db_user.id)
-        .first()
-    )
-    return db_user
+    return await _load_user(db, db_user.id)
 
 
 @router.post("/register", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user with email and full name only
     Email verification required before setting password
@@ -127,7 +140,7 @@ async def register_user(user: UserRegister, db: Session = Depends(get_db)):
     In production, token should only be sent via email
     """
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
@@ -155,21 +168,12 @@ async def register_user(user: UserRegister, db: Session = Depends(get_db)):
         updatedAt=now
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
     # TODO: Send verification email here
     # In production, integrate with email service (SendGrid, AWS SES, etc.)
     # For now, verification token is returned in response (for testing)
     
-    # Eager load credential for response (will be None initially)
-    db_user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == db_user.id)
-        .first()
-    )
-    
     # Return user with verification token (for development/testing only)
     # In production, token should only be sent via email
     # We need to manually construct the response since verificationToken is not in the model
@@ -195,26 +199,26 @@ async def register_user(user: UserRegister, db: Session = Depends(get_db)):
 async def update_current_user_profile(
     user: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update current user's profile (convenience endpoint)
     Accepts firstName, lastName, and email (all optional)
     IMPORTANT: This route must be defined BEFORE /{user_id} to avoid route matching conflicts
     """
-    db_user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == current_user.id)
-        .first()
-    )
+    db_user = await _load_user(db, current_user.id)
     
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
+    # Principal cache is keyed by email, which may change below
+    old_email = db_user.email
+    
     if user.email:
         # Check if email already exists (excluding current user)
-        existing_user = db.query(User).filter(User.email == user.email, User.id != current_user.id).first()
+        existing_user = await db.scalar(
+            select(User.id).where(User.email == user.email, User.id != current_user.id)
+        )
         if existing_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
         db_user.email = user.email
@@ -226,16 +230,8 @@ async def update_current_user_profile(
         db_user.lastName = user.lastName
     
     db_user.updatedAt = datetime.now()
-    db.commit()
-    db.refresh(db_user)
-    
-    # Eager load credential for response
-    db_user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == current_user.id)
-        .first()
-    )
+    await db.commit()
+    principal_cache.invalidate(old_email, db_user.email)
     return db_user
 
 
@@ -244,7 +240,7 @@ async def update_user(
     user_id: int, 
     user: UserUpdate, 
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user (profile info only) - Users can only update their own profile"""
     # Check if user is updating their own profile
@@ -254,13 +250,18 @@ async def update_user(
             detail="You can only update your own profile"
         )
     
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await _load_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
+    # Principal cache is keyed by email, which may change below
+    old_email = db_user.email
+    
     if user.email:
         # Check if email already exists (excluding current user)
-        existing_user = db.query(User).filter(User.email == user.email, User.id != user_id).first()
+        existing_user = await db.scalar(
+            select(User.id).where(User.email == user.email, User.id != user_id)
+        )
         if existing_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
         db_user.email = user.email
@@ -272,15 +273,8 @@ async def update_user(
         db_user.lastName = user.lastName
     
     db_user.updatedAt = datetime.now()
-    db.commit()
-    db.refresh(db_user)
-    # Eager load credential for response
-    db_user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == user_id)
-        .first()
-    )
+    await db.commit()
+    principal_cache.invalidate(old_email, db_user.email)
     return db_user
 
 
@@ -288,15 +282,10 @@ async def update_user(
 async def approve_user(
     user_id: int,
     admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve a user (admin only)"""
-    user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == user_id)
-        .first()
-    )
+    user = await _load_user(db, user_id)
     
     if not user:
         raise HTTPException(
@@ -312,8 +301,8 @@ async def approve_user(
     
     # Approve the user
     user.isApproved = True
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return user
 
@@ -322,15 +311,10 @@ async def approve_user(
 async def reject_user(
     user_id: int,
     admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reject/unapprove a user (admin only)"""
-    user = (
-        db.query(User)
-        .options(joinedload(User.credential))
-        .filter(User.id == user_id)
-        .first()
-    )
+    user = await _load_user(db, user_id)
     
     if not user:
         raise HTTPException(
@@ -340,8 +324,8 @@ async def reject_user(
     
     # Reject the user
     user.isApproved = False
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    principal_cache.invalidate(user.email)
     
     return user
 
@@ -351,26 +335,25 @@ async def get_pending_users(
     admin_user: User = Depends(get_current_admin_user),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all pending approval users (admin only)"""
-    users = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .options(joinedload(User.credential))
-        .filter(User.isApproved == False)
-        .filter(User.emailVerified == True)  # Only show verified users
+        .where(User.isApproved == False)
+        .where(User.emailVerified == True)  # Only show verified users
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    return users
+    return result.scalars().all()
 
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user (credential and related data will be cascade deleted)"""
     # Check if user is deleting their own account or has admin rights
@@ -380,14 +363,25 @@ async def delete_user(
             detail="You can only delete your own account"
         )
     
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # Chats losing messages below: lock them first (Chat -> ChatUser lock order, like senders)
+    result = await db.execute(
+        select(Chat.id)
+        .where(Chat.id.in_(select(ChatMessage.chatId).where(ChatMessage.userId == user_id)))
+        .order_by(Chat.id)
+        .with_for_update()
+    )
+    affected_chat_ids = result.scalars().all()
     
-    # Delete user - cascade will automatically delete:
+    # Delete user with a single DELETE - the database cascade will automatically delete:
     # - Credential (via ondelete="CASCADE")
     # - ChatUser entries (via ondelete="CASCADE")
     # - ChatMessage entries (via ondelete="CASCADE")
-    db.delete(db_user)
-    db.commit()
+    # (an ORM delete would load and try to null out every ChatMessage.userId first)
+    result = await db.execute(User.__table__.delete().where(User.id == user_id))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # The cascade bypasses record_message_deleted: rebuild counts, last messages and unread counts
+    await recompute_chat_summaries(db, affected_chat_ids)
+    await db.commit()
+    principal_cache.invalidate(current_user.email)
     return {"message": "User deleted successfully"}
@@ -1,10 +1,11 @@
 """
 Chat schemas for request/response validation
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
-from app.schemas.user import UserResponse
+from typing import Optional, List, Dict, Union
+from typing_extensions import Annotated
+from app.schemas.user import UserResponse, UserBrief
 
 
 class ChatBase(BaseModel):
@@ -39,12 +40,76 @@ class ChatResponse(ChatBase):
     createdAt: datetime
     updatedAt: datetime
     lastUsed: datetime
+    messageCount: int = 0
+    lastMessageId: Optional[int] = None
     users: Optional[List[UserResponse]] = None
 
     class Config:
         from_attributes = True
 
 
+class ChatCompact(ChatBase):
+    """Schema for a chat with member ids only (look them up in the response's users map)"""
+    id: int
+    createdAt: datetime
+    updatedAt: datetime
+    lastUsed: datetime
+    messageCount: int = 0
+    lastMessageId: Optional[int] = None
+    userIds: List[int] = []
+
+
+class ChatCompactResponse(ChatCompact):
+    """Schema for a compact chat with its members sideloaded"""
+    users: Dict[int, UserBrief]
+
+
+class ChatListPage(BaseModel):
+    """Schema for a compact chat list: each member appears once in users, however many chats share them"""
+    chats: List[ChatCompact]
+    users: Dict[int, UserBrief]
+
+
+# Response models of the chat endpoints: full shape, or compact (?compact=true)
+# left_to_right: the full shape is tried first and wins outright (smart mode would also try the compact one)
+ChatListResponse = Annotated[Union[List[ChatResponse], ChatListPage], Field(union_mode="left_to_right")]
+ChatDetailResponse = Annotated[Union[ChatResponse, ChatCompactResponse], Field(union_mode="left_to_right")]
+
+
+class ChatLastMessagePreview(BaseModel):
+    """Schema for the last message shown in the chat list (truncated)"""
+    id: int
+    userId: int
+    preview: str
+    createdAt: datetime
+
+
+class ChatSummaryResponse(ChatBase):
+    """Schema for chat list entries (no member objects, just the counts the sidebar needs)"""
+    id: int
+    createdAt: datetime
+    updatedAt: datetime
+    lastUsed: datetime
+    role: Optional[str] = None  # Current user's role in the chat
+    memberCount: int
+    messageCount: int
+    unreadCount: int
+    lastReadMessageId: Optional[int] = None
+    lastMessage: Optional[ChatLastMessagePreview] = None
+
+
+class ChatMarkRead(BaseModel):
+    """Schema for marking a chat read (messageId omitted = everything)"""
+    messageId: Optional[int] = None
+
+
+class ChatReadStateResponse(BaseModel):
+    """Schema for the current user's read state in a chat"""
+    chatId: int
+    lastReadMessageId: Optional[int] = None
+    unreadCount: int
+
+
 class ChatUserCreate(BaseModel):
     """Schema for adding user to chat"""
     userId: int
@@ -1,10 +1,11 @@
 """
 Chat message schemas for request/response validation
 """
-from pydantic import BaseModel
+from pydantic import AwareDatetime, BaseModel, Field
 from datetime import datetime
-from typing import Optional
-from app.schemas.user import UserResponse
+from typing import Optional, List, Dict, Union
+from typing_extensions import Annotated
+from app.schemas.user import UserResponse, UserBrief
 
 
 class ChatMessageBase(BaseModel):
@@ -17,6 +18,16 @@ class ChatMessageCreate(ChatMessageBase):
     pass
 
 
+class ChatMessageBatchItem(ChatMessageBase):
+    """One imported message; createdAt keeps its original time (timezone required, default: time of import)"""
+    createdAt: Optional[AwareDatetime] = None
+
+
+class ChatMessageBatchCreate(BaseModel):
+    """Schema for importing many messages at once (all sent by the current user)"""
+    messages: List[ChatMessageBatchItem] = Field(..., min_length=1, max_length=5000)
+
+
 class ChatMessageUpdate(BaseModel):
     """Schema for updating a chat message"""
     message: str
@@ -33,3 +44,41 @@ class ChatMessageResponse(ChatMessageBase):
 
     class Config:
         from_attributes = True
+
+
+class ChatMessageCompact(ChatMessageBase):
+    """Schema for a chat message without its sender (look userId up in the page's users map)"""
+    id: int
+    chatId: int
+    userId: int
+    createdAt: datetime
+    updatedAt: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChatMessagePage(BaseModel):
+    """Schema for a compact message page: each sender appears once in users"""
+    messages: List[ChatMessageCompact]
+    users: Dict[int, UserBrief]
+
+
+# Response model of the message list: full messages, or a compact page (?compact=true)
+# left_to_right: the full list is tried first and wins outright (smart mode would also try the page)
+ChatMessageListResponse = Annotated[Union[List[ChatMessageResponse], ChatMessagePage], Field(union_mode="left_to_right")]
+
+
+class ChatMessageSearchResult(BaseModel):
+    """Schema for a full-text search hit"""
+    id: int
+    chatId: int
+    userId: int
+    message: str
+    createdAt: datetime
+    updatedAt: datetime
+    rank: float
+    snippet: str  # HTML: escaped message text with matched terms wrapped in <mark>...</mark>
+
+    class Config:
+        from_attributes = True
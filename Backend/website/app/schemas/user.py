@@ -63,6 +63,12 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserBrief(BaseModel):
+    """Compact user reference (sideloaded once per response in compact list payloads)"""
+    id: int
+    displayName: str
+
+
 class VerifyEmailRequest(BaseModel):
     """Schema for email verification"""
     token: str
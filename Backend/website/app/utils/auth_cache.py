@@ -0,0 +1,87 @@
+"""
+TTL/LRU cache of authenticated principals (User + Credential) keyed by token subject (email)
+Lets get_current_user skip the User/Credential query on steady-state requests
+- Entries are detached snapshots, re-attached per request with session.merge(load=False) (no SQL)
+- Invalidations go through the broadcast layer so every worker drops the entry
+  (needs BROADCAST_BACKEND=postgres with several workers; the memory backend stays in-process)
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.models import User
+from app.utils.broadcast import broadcast
+
+# Max cached principals and how long (seconds) an entry may be served
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+# Broadcast channel carrying invalidated token subjects
+AUTH_INVALIDATE_CHANNEL = "auth_invalidate"
+
+
+def _column_copy(instance, **extra):
+    """Transient copy of an ORM instance's column values (relationships passed in extra)"""
+    values = {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+    return type(instance)(**values, **extra)
+
+
+class PrincipalCache:
+    """LRU of detached User snapshots with per-entry expiry"""
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL, backend=broadcast):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.backend.subscribe(AUTH_INVALIDATE_CHANNEL, self._on_invalidate)
+
+    def get(self, subject: str) -> Optional[User]:
+        """Cached snapshot for a subject (None if missing or expired)"""
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, subject: str, user: User):
+        """Cache a snapshot of a loaded user (credential must already be loaded)"""
+        credential = None
+        if user.credential is not None:
+            credential = _column_copy(user.credential)
+        snapshot = _column_copy(user, credential=credential)
+        # Detached (identity set, no pending changes) so merge(load=False) accepts it
+        make_transient_to_detached(snapshot)
+        if credential is not None:
+            make_transient_to_detached(credential)
+        self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: Optional[str]):
+        """Drop cached principals on every worker (call after the change is committed)"""
+        for subject in subjects:
+            if subject:
+                # Drop locally right away (read-your-writes), then tell the other workers
+                self._entries.pop(subject, None)
+                self.backend.publish(AUTH_INVALIDATE_CHANNEL, subject)
+
+    def _on_invalidate(self, subject: str):
+        self._entries.pop(subject, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
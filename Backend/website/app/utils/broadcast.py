@@ -0,0 +1,235 @@
+"""
+Pluggable broadcast layer for cross-worker events (chat events, log streaming)
+- memory:   single process, publish delivers straight to local subscribers
+- postgres: LISTEN/NOTIFY, every uvicorn worker on the same database receives every event
+Select with BROADCAST_BACKEND=memory|postgres (default: memory)
+"""
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+# NOTE: records from this logger are not streamed by routers/logs.py (prevents publish -> log -> publish loops)
+logger = logging.getLogger("app.broadcast")
+
+Subscriber = Callable[[str], None]
+
+
+class MemoryBroadcast:
+    """Single-process backend: events are delivered to local subscribers directly"""
+    # No payload size limit in memory
+    max_payload_bytes: Optional[int] = None
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    async def connect(self):
+        """Start the backend (call once at app startup, inside the serving event loop)"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+
+    async def disconnect(self):
+        """Stop the backend"""
+        self._loop = None
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        """Register a callback for a channel (called in the event loop with the message string)"""
+        self._subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel: str, callback: Subscriber):
+        """Remove a channel callback"""
+        callbacks = self._subscribers.get(channel)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, channel: str, message: str):
+        """Publish a message to a channel (non-blocking, must be called from the event loop)"""
+        self._deliver(channel, message)
+
+    def publish_threadsafe(self, channel: str, message: str):
+        """Publish from any thread (e.g. logging handlers); dropped before startup"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if threading.get_ident() == self._loop_thread_id:
+            # Already on the loop thread: skip the self-pipe wakeup of call_soon_threadsafe
+            loop.call_soon(self.publish, channel, message)
+        else:
+            loop.call_soon_threadsafe(self.publish, channel, message)
+
+    def _deliver(self, channel: str, message: str):
+        """Hand a message to this process's subscribers"""
+        for callback in list(self._subscribers.get(channel, ())):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Broadcast subscriber failed on channel %s", channel)
+
+
+class PostgresBroadcast(MemoryBroadcast):
+    """Multi-worker backend using PostgreSQL LISTEN/NOTIFY"""
+    # PostgreSQL limits NOTIFY payloads to 8000 bytes (keep room for the sequence prefix)
+    max_payload_bytes = 7900
+    # Max notifications sent in one round-trip
+    BATCH_SIZE = 500
+    OUTBOX_SIZE = 10000
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._notify_conn: Optional[asyncpg.Connection] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        # NOTIFY collapses identical payloads within a transaction, so each one gets a unique prefix
+        self._seq = itertools.count()
+
+    async def connect(self):
+        await super().connect()
+        self._outbox = asyncio.Queue(maxsize=self.OUTBOX_SIZE)
+        await self._open_connections()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def disconnect(self):
+        for task in (self._writer, self._reconnecting):
+            if task is not None:
+                task.cancel()
+        self._writer = self._reconnecting = self._outbox = None
+        await self._close_connections()
+        await super().disconnect()
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        is_new_channel = channel not in self._subscribers
+        super().subscribe(channel, callback)
+        if is_new_channel and self._listen_conn is not None:
+            asyncio.create_task(self._listen_conn.add_listener(channel, self._on_notify))
+
+    def publish(self, channel: str, message: str):
+        if self._outbox is None:
+            # Not started (or shutting down): this process is the only audience
+            self._deliver(channel, message)
+            return
+        if len(message.encode("utf-8")) > self.max_payload_bytes:
+            logger.warning("Broadcast payload on %s too large for NOTIFY, delivered locally only", channel)
+            self._deliver(channel, message)
+            return
+        try:
+            self._outbox.put_nowait((channel, f"{next(self._seq)}:{message}"))
+        except asyncio.QueueFull:
+            logger.warning("Broadcast outbox full, delivering on %s locally only", channel)
+            self._deliver(channel, message)
+
+    async def _open_connections(self):
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        self._listen_conn.add_termination_listener(self._on_terminated)
+        for channel in list(self._subscribers):
+            await self._listen_conn.add_listener(channel, self._on_notify)
+        self._notify_conn = await asyncpg.connect(self.dsn)
+
+    async def _close_connections(self):
+        for conn in (self._listen_conn, self._notify_conn):
+            if conn is not None and not conn.is_closed():
+                try:
+                    await conn.close(timeout=5)
+                except Exception:
+                    conn.terminate()
+        self._listen_conn = self._notify_conn = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        # Strip the sequence prefix added in publish()
+        self._deliver(channel, payload.split(":", 1)[1])
+
+    def _on_terminated(self, connection):
+        if self._outbox is not None:
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self._reconnecting is None or self._reconnecting.done():
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Re-open LISTEN/NOTIFY connections with exponential backoff"""
+        delay = 0.5
+        while True:
+            await self._close_connections()
+            try:
+                await self._open_connections()
+                logger.info("Broadcast reconnected to PostgreSQL")
+                return
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Broadcast reconnect failed (%s), retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def _write_loop(self):
+        """Drain the outbox, sending queued notifications in one round-trip per batch"""
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < self.BATCH_SIZE and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            channels = [channel for channel, _ in batch]
+            payloads = [payload for _, payload in batch]
+            try:
+                if self._reconnecting is not None and not self._reconnecting.done():
+                    await self._reconnecting
+                await self._notify_conn.execute(
+                    "SELECT pg_notify(c, p) FROM unnest($1::text[], $2::text[]) AS t(c, p)",
+                    channels,
+                    payloads
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Other workers miss these events, but local clients still get them
+                logger.warning("Broadcast NOTIFY failed (%s), delivered %d events locally", e, len(batch))
+                for channel, payload in batch:
+                    self._deliver(channel, payload.split(":", 1)[1])
+                self._schedule_reconnect()
+
+
+def _to_asyncpg_dsn(url: str) -> str:
+    """asyncpg.connect() only accepts plain postgresql:// DSNs"""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def configured_workers() -> int:
+    """
+    Number of server worker processes, as far as this process can tell:
+    WEB_CONCURRENCY (the default of uvicorn --workers and gunicorn -w) or the command line's --workers / -w
+    """
+    workers = os.getenv("WEB_CONCURRENCY", "1")
+    args = sys.argv[1:]
+    for index, arg in enumerate(args):
+        if arg in ("--workers", "-w") and index + 1 < len(args):
+            workers = args[index + 1]
+        elif arg.startswith("--workers="):
+            workers = arg.split("=", 1)[1]
+    try:
+        return int(workers)
+    except ValueError:
+        return 1
+
+
+def create_broadcast():
+    """Create the broadcast backend selected by BROADCAST_BACKEND"""
+    backend = os.getenv("BROADCAST_BACKEND", "memory").lower()
+    if backend == "postgres":
+        from app.database import DATABASE_URL
+        return PostgresBroadcast(_to_asyncpg_dsn(DATABASE_URL))
+    if backend != "memory":
+        raise ValueError(f"Unknown BROADCAST_BACKEND: {backend!r} (expected 'memory' or 'postgres')")
+    return MemoryBroadcast()
+
+
+# Global broadcast instance (connected on app startup)
+broadcast = create_broadcast()
@@ -0,0 +1,89 @@
+"""
+Fan-out hub for realtime chat events
+Events go through the broadcast layer (so every worker sees them), then each worker
+fans them out to its local WebSocket connections; each connection has its own bounded queue
+"""
+import asyncio
+import json
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from app.utils.broadcast import broadcast
+
+# Broadcast channel carrying chat events
+CHAT_CHANNEL = "chat_events"
+
+# Max pending events per connection before it is treated as a slow consumer
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class ChatHub:
+    """Fan-out of chat events to the WebSocket connections of each chat"""
+    def __init__(self, backend=broadcast, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self.backend.subscribe(CHAT_CHANNEL, self._on_broadcast)
+
+    def subscribe(self, chat_id: int) -> asyncio.Queue:
+        """Register a connection for a chat and return its event queue"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[chat_id].add(queue)
+        return queue
+
+    def unsubscribe(self, chat_id: int, queue: asyncio.Queue):
+        """Remove a connection from a chat"""
+        subscribers = self._subscribers.get(chat_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[chat_id]
+
+    def connection_count(self, chat_id: Optional[int] = None) -> int:
+        """Number of connected clients (for one chat or overall)"""
+        if chat_id is not None:
+            return len(self._subscribers.get(chat_id, ()))
+        return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, chat_id: int, event: dict):
+        """Publish an event to every connection of a chat, on every worker (non-blocking)"""
+        # Serialize once, not once per connection
+        data = json.dumps(event, default=str)
+        max_bytes = self.backend.max_payload_bytes
+        if max_bytes is not None and len(data.encode("utf-8")) > max_bytes:
+            # Too large for the backend: send the message id only, clients fetch the message
+            message = event.get("message") or {}
+            data = json.dumps({
+                "type": event.get("type"),
+                "chatId": chat_id,
+                "message": {"id": message.get("id")},
+                "truncated": True
+            })
+        # Prefix the chat id so receivers route without parsing the JSON
+        self.backend.publish(CHAT_CHANNEL, f"{chat_id}:{data}")
+
+    def _on_broadcast(self, payload: str):
+        """Broadcast callback: route an event to this worker's connections"""
+        chat_id, data = payload.split(":", 1)
+        self._dispatch(int(chat_id), data)
+
+    def _dispatch(self, chat_id: int, data: str):
+        """Push serialized event data to the local connections of a chat"""
+        subscribers = self._subscribers.get(chat_id)
+        if not subscribers:
+            return
+        for queue in list(subscribers):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and tell it to disconnect,
+                # the client resyncs with GET /messages?after=<cursor> on reconnect
+                self._subscribers[chat_id].discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+# Global chat hub instance
+chat_hub = ChatHub()
@@ -0,0 +1,233 @@
+"""
+Denormalised per-chat summary maintenance
+- Chat: messageCount and last message (id, sender, preview, time)
+- ChatUser: lastReadMessageId and unreadCount per member
+Call these inside the transaction that changes the messages, before commit
+Lock order is always Chat row -> ChatUser rows, so concurrent senders serialise instead of deadlocking
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select, case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, ChatMessage, chat_users
+
+# Characters of the last message kept in the chat summary
+MESSAGE_PREVIEW_LENGTH = 120
+
+
+def message_preview(text: str) -> str:
+    """Truncated message text stored as the chat's last message preview"""
+    return text[:MESSAGE_PREVIEW_LENGTH]
+
+
+def chat_messages_added(chat_id, count, last_id, last_user_id, last_preview, last_created_at, now: datetime):
+    """
+    UPDATE for the chat row after messages were inserted
+    chat_id/last_* are values or SQL expressions (e.g. columns of an INSERT ... RETURNING CTE)
+    """
+    # Concurrent senders can commit out of order: never replace a newer last message
+    is_newer = func.coalesce(Chat.lastMessageId, 0) < last_id
+    return (
+        Chat.__table__.update()
+        .where(Chat.id == chat_id)
+        .values(
+            lastUsed=now,
+            updatedAt=now,
+            messageCount=Chat.messageCount + count,
+            lastMessageId=case((is_newer, last_id), else_=Chat.lastMessageId),
+            lastMessageUserId=case((is_newer, last_user_id), else_=Chat.lastMessageUserId),
+            lastMessagePreview=case((is_newer, last_preview), else_=Chat.lastMessagePreview),
+            lastMessageAt=case((is_newer, last_created_at), else_=Chat.lastMessageAt)
+        )
+    )
+
+
+def members_messages_added(chat_id, sender_id: int, count, last_id):
+    """UPDATE for the members' read state after messages were inserted by one sender"""
+    # Sending implies having read the chat; everyone else gets `count` more unread
+    is_sender = chat_users.c.userId == sender_id
+    return (
+        chat_users.update()
+        .where(chat_users.c.chatId == chat_id)
+        .values(
+            unreadCount=case((is_sender, 0), else_=chat_users.c.unreadCount + count),
+            lastReadMessageId=case(
+                (is_sender, func.greatest(func.coalesce(chat_users.c.lastReadMessageId, 0), last_id)),
+                else_=chat_users.c.lastReadMessageId
+            )
+        )
+    )
+
+
+async def record_messages_added(
+    db: AsyncSession,
+    chat_id: int,
+    sender_id: int,
+    last_message,
+    now: datetime,
+    count: int = 1
+):
+    """
+    Update the summary after `count` messages were inserted by one sender
+    last_message is the newest of them: a flushed ChatMessage or a RETURNING row (id, message, createdAt)
+    """
+    await db.execute(chat_messages_added(
+        chat_id,
+        count,
+        last_message.id,
+        sender_id,
+        message_preview(last_message.message),
+        last_message.createdAt,
+        now
+    ))
+    await db.execute(members_messages_added(chat_id, sender_id, count, last_message.id))
+
+
+async def record_message_edited(db: AsyncSession, message: ChatMessage, now: datetime):
+    """Mark the chat changed (its ETag version) and refresh the preview if it's the last message"""
+    await db.execute(
+        Chat.__table__.update()
+        .where(Chat.id == message.chatId)
+        .values(
+            updatedAt=now,
+            lastUsed=Chat.lastUsed,  # An edit is not new activity: keep the chat list order
+            lastMessagePreview=case(
+                (Chat.lastMessageId == message.id, message_preview(message.message)),
+                else_=Chat.lastMessagePreview
+            )
+        )
+    )
+
+
+async def record_message_deleted(db: AsyncSession, message: ChatMessage):
+    """Update the summary after a message was deleted (call after the DELETE is flushed)"""
+    result = await db.execute(
+        Chat.__table__.update()
+        .where(Chat.id == message.chatId)
+        .values(
+            messageCount=func.greatest(Chat.messageCount - 1, 0),
+            lastUsed=Chat.lastUsed  # A delete is not new activity: keep the chat list order
+        )
+        .returning(Chat.lastMessageId)
+    )
+    # The FK's ON DELETE SET NULL has already cleared lastMessageId if it was this message
+    if result.scalar() in (None, message.id):
+        # The last message went away: fall back to the newest remaining one (index seek)
+        newest = (await db.execute(
+            select(ChatMessage.id, ChatMessage.userId, ChatMessage.message, ChatMessage.createdAt)
+            .where(ChatMessage.chatId == message.chatId)
+            .order_by(ChatMessage.createdAt.desc(), ChatMessage.id.desc())
+            .limit(1)
+        )).first()
+        await db.execute(
+            Chat.__table__.update()
+            .where(Chat.id == message.chatId)
+            .values(
+                lastMessageId=newest.id if newest else None,
+                lastMessageUserId=newest.userId if newest else None,
+                lastMessagePreview=message_preview(newest.message) if newest else None,
+                lastMessageAt=newest.createdAt if newest else None,
+                lastUsed=Chat.lastUsed
+            )
+        )
+    # Members who hadn't read it yet have one unread message less
+    await db.execute(
+        chat_users.update()
+        .where(
+            (chat_users.c.chatId == message.chatId) &
+            (chat_users.c.userId != message.userId) &
+            (func.coalesce(chat_users.c.lastReadMessageId, 0) < message.id)
+        )
+        .values(unreadCount=func.greatest(chat_users.c.unreadCount - 1, 0))
+    )
+
+
+async def recompute_chat_summaries(db: AsyncSession, chat_ids: Iterable[int]):
+    """
+    Rebuild the summary of whole chats from their messages (same as the chat_summary migration's backfill)
+    For messages removed without record_message_deleted, e.g. cascaded from deleting their sender;
+    lock the chat rows before deleting to keep the Chat -> ChatUser lock order
+    """
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return
+    message_count = select(func.count()).where(ChatMessage.chatId == Chat.id).scalar_subquery()
+    await db.execute(
+        Chat.__table__.update()
+        .where(Chat.id.in_(chat_ids))
+        .values(
+            messageCount=message_count,
+            lastMessageId=None,
+            lastMessageUserId=None,
+            lastMessagePreview=None,
+            lastMessageAt=None,
+            lastUsed=Chat.lastUsed
+        )
+    )
+    newest = (
+        select(ChatMessage.chatId, ChatMessage.id, ChatMessage.userId, ChatMessage.message, ChatMessage.createdAt)
+        .where(ChatMessage.chatId.in_(chat_ids))
+        .distinct(ChatMessage.chatId)
+        .order_by(ChatMessage.chatId, ChatMessage.createdAt.desc(), ChatMessage.id.desc())
+        .subquery("newest")
+    )
+    await db.execute(
+        Chat.__table__.update()
+        .where(Chat.id == newest.c.chatId)
+        .values(
+            lastMessageId=newest.c.id,
+            lastMessageUserId=newest.c.userId,
+            lastMessagePreview=func.left(newest.c.message, MESSAGE_PREVIEW_LENGTH),
+            lastMessageAt=newest.c.createdAt,
+            lastUsed=Chat.lastUsed
+        )
+    )
+    unread = (
+        select(func.count())
+        .select_from(ChatMessage)
+        .where(
+            ChatMessage.chatId == chat_users.c.chatId,
+            ChatMessage.id > func.coalesce(chat_users.c.lastReadMessageId, 0),
+            ChatMessage.userId != chat_users.c.userId
+        )
+        .scalar_subquery()
+    )
+    await db.execute(chat_users.update().where(chat_users.c.chatId.in_(chat_ids)).values(unreadCount=unread))
+
+
+async def mark_read(db: AsyncSession, chat_id: int, user_id: int, message_id: Optional[int] = None):
+    """
+    Move a member's read marker forward (never backward)
+    message_id None marks everything read; returns (lastReadMessageId, unreadCount), or None if not a member
+    """
+    is_member = (chat_users.c.chatId == chat_id) & (chat_users.c.userId == user_id)
+    if message_id is None:
+        last_message_id = select(Chat.lastMessageId).where(Chat.id == chat_id).scalar_subquery()
+        values = {
+            "lastReadMessageId": func.coalesce(last_message_id, chat_users.c.lastReadMessageId),
+            "unreadCount": 0
+        }
+    else:
+        read_up_to = func.greatest(func.coalesce(chat_users.c.lastReadMessageId, 0), message_id)
+        # Partial read: count what's left (only messages newer than the marker are scanned)
+        remaining = (
+            select(func.count())
+            .select_from(ChatMessage)
+            .where(
+                ChatMessage.chatId == chat_id,
+                ChatMessage.id > read_up_to,
+                ChatMessage.userId != user_id
+            )
+            .scalar_subquery()
+        )
+        values = {"lastReadMessageId": read_up_to, "unreadCount": remaining}
+
+    result = await db.execute(
+        chat_users.update()
+        .where(is_member)
+        .values(**values)
+        .returning(chat_users.c.lastReadMessageId, chat_users.c.unreadCount)
+    )
+    return result.first()
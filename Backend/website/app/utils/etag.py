@@ -0,0 +1,102 @@
+"""
+Weak ETags for conditional GETs (If-None-Match -> 304)
+ETags are hashed from small "version" rows (updatedAt / counters / last ids) that are cheap to
+query, so an unchanged resource is answered before the heavy query and serialisation run
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select, func, true, cast, literal, Text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Chat, User, Credential, chat_users
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from version parts (any values with a stable str())"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against the request's If-None-Match header"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:]  # Without the W/ prefix
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def set_etag(response: Response, etag: str):
+    """Attach the ETag; private + no-cache makes clients revalidate instead of reusing blindly"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching If-None-Match"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
+
+
+def _member_versions(chat_filter):
+    """Member count and latest profile/credential change of the members of the matching chats"""
+    return (
+        select(
+            func.count().label("memberCount"),
+            func.max(User.updatedAt).label("usersUpdatedAt"),
+            func.max(Credential.updatedAt).label("credentialsUpdatedAt")
+        )
+        .select_from(chat_users)
+        .join(User, User.id == chat_users.c.userId)
+        .outerjoin(Credential, Credential.userId == User.id)
+        .where(chat_filter)
+        .subquery("member_versions")
+    )
+
+
+async def chat_version(db: AsyncSession, chat_id: int) -> Optional[tuple]:
+    """Version of a chat, its members and its messages (None if the chat doesn't exist)"""
+    members = _member_versions(chat_users.c.chatId == chat_id)
+    result = await db.execute(
+        select(Chat.updatedAt, Chat.lastUsed, Chat.messageCount, Chat.lastMessageId, members)
+        .select_from(Chat)
+        .join(members, true())  # Single aggregate row
+        .where(Chat.id == chat_id)
+    )
+    return result.first()
+
+
+async def chat_list_version(db: AsyncSession, user_id: int) -> tuple:
+    """Version of all chats of a user (and their members)"""
+    my_chats = select(chat_users.c.chatId).where(chat_users.c.userId == user_id)
+    chats = (
+        select(
+            func.count().label("chatCount"),
+            # Digest of the exact id set (a sum collides: leaving 3 and 5 and joining 8 keeps it)
+            func.md5(func.string_agg(cast(Chat.id, Text), aggregate_order_by(literal(","), Chat.id))).label("chatIds"),
+            func.max(Chat.updatedAt).label("chatsUpdatedAt"),
+            func.max(Chat.lastUsed).label("chatsLastUsed"),
+            func.sum(Chat.messageCount).label("messageCount")
+        )
+        .where(Chat.id.in_(my_chats))
+        .subquery("chat_versions")
+    )
+    members = _member_versions(chat_users.c.chatId.in_(my_chats))
+    result = await db.execute(select(chats, members).select_from(chats.join(members, true())))
+    return tuple(result.first())
+
+
+async def user_version(db: AsyncSession, user_id: int) -> Optional[tuple]:
+    """Version of a user and its credential (None if the user doesn't exist)"""
+    result = await db.execute(
+        select(User.updatedAt, Credential.updatedAt)
+        .outerjoin(Credential, Credential.userId == User.id)
+        .where(User.id == user_id)
+    )
+    return result.first()
@@ -1,11 +1,14 @@
 """
 JWT utilities for authentication
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,6 +18,13 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Cache of already-verified tokens: sha256(token) -> (exp, payload)
+# The same 7-day token is presented on every request, so repeat requests skip
+# signature verification and claims parsing until the token expires
+TOKEN_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0}
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -30,13 +40,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def verify_token(token: str) -> dict:
-    """Verify and decode a JWT token"""
+    """Verify and decode a JWT token (verified tokens are cached until they expire)"""
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        if cached[0] > time.time():
+            _token_cache.move_to_end(key)
+            _token_cache_stats["hits"] += 1
+            return dict(cached[1])
+        del _token_cache[key]
+    _token_cache_stats["misses"] += 1
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Only cache tokens that expire (jose already rejected expired ones)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache[key] = (exp, payload)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return dict(payload)
+
+
+def get_token_cache_stats() -> dict:
+    """Verified-token cache size and hit/miss counters"""
+    return {"size": len(_token_cache), "maxsize": TOKEN_CACHE_SIZE, **_token_cache_stats}
@@ -0,0 +1,232 @@
+"""
+Bounded in-memory store of recent log records, with optional rotating on-disk segments
+- Memory: fixed-size ring of __slots__ entries (no per-record dicts), oldest overwritten first
+- Disk (optional, LOG_STORE_DIR): JSON-lines segment files, rotated by size; on startup the
+  ring is warmed from the newest segments so recent history survives restarts
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Number of records kept in memory
+DEFAULT_CAPACITY = int(os.getenv("LOG_STORE_CAPACITY", "10000"))
+# Segment files: directory (disabled if unset), max size per segment, segments kept
+LOG_STORE_DIR = os.getenv("LOG_STORE_DIR")
+SEGMENT_MAX_BYTES = int(os.getenv("LOG_STORE_SEGMENT_BYTES", str(5 * 1024 * 1024)))
+SEGMENT_COUNT = int(os.getenv("LOG_STORE_SEGMENTS", "5"))
+# Segment writes are buffered and flushed at most this often (seconds)
+SEGMENT_FLUSH_INTERVAL = 1.0
+
+
+class LogEntry:
+    """One stored log record"""
+    __slots__ = ("seq", "created", "levelno", "level", "source", "message")
+
+    def __init__(self, seq: int, created: float, levelno: int, level: str, source: str, message: str):
+        self.seq = seq
+        self.created = created
+        self.levelno = levelno
+        self.level = level
+        self.source = source
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "timestamp": datetime.fromtimestamp(self.created).isoformat(),
+            "level": self.level,
+            "source": self.source,
+            "message": self.message
+        }
+
+
+class SegmentWriter:
+    """Append-only JSON-lines segment files rotated by size (one writer per process)"""
+    def __init__(self, directory: str, max_bytes: int = SEGMENT_MAX_BYTES, max_segments: int = SEGMENT_COUNT):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def segment_paths(self) -> List[str]:
+        """All segment files (every worker's), oldest first"""
+        return sorted(glob.glob(os.path.join(self.directory, "logs-*.jsonl")), key=os.path.getmtime)
+
+    def write(self, entry: LogEntry):
+        if self._file is None or self._size >= self.max_bytes:
+            self._rotate()
+        line = json.dumps(
+            [entry.created, entry.levelno, entry.level, entry.source, entry.message],
+            ensure_ascii=False
+        ) + "\n"
+        self._file.write(line)
+        self._size += len(line)
+        now = time.monotonic()
+        if now - self._last_flush >= SEGMENT_FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = now
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        # Name includes the pid so several uvicorn workers never share a file
+        path = os.path.join(self.directory, f"logs-{time.time_ns()}-{os.getpid()}.jsonl")
+        self._file = open(path, "a", encoding="utf-8")
+        self._path = path
+        self._size = 0
+        self._prune()
+
+    def _prune(self):
+        """
+        Remove the oldest segments beyond max_segments, but only this process's own closed segments
+        and those of exited processes: another live worker's segments (one is its open file) are its own to prune
+        """
+        paths = self.segment_paths()
+        excess = len(paths) - self.max_segments
+        for old_path in paths:
+            if excess <= 0:
+                break
+            if old_path == self._path or not self._removable(old_path):
+                continue
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+            excess -= 1
+
+    @staticmethod
+    def _removable(path: str) -> bool:
+        try:
+            pid = int(os.path.basename(path)[:-len(".jsonl")].rsplit("-", 1)[1])
+        except (IndexError, ValueError):
+            return False
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True  # Writer has exited
+        except OSError:
+            pass  # Exists, owned by another user
+        return False
+
+    def read_tail(self, count: int) -> List[list]:
+        """Last `count` records across the existing segments (oldest first)"""
+        rows: List[list] = []
+        for path in reversed(self.segment_paths()):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except OSError:
+                continue
+            segment_rows = []
+            for line in lines:
+                try:
+                    segment_rows.append(json.loads(line))
+                except ValueError:
+                    continue  # Partially written line
+            rows = segment_rows + rows
+            if len(rows) >= count:
+                break
+        return rows[-count:]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._path = None
+
+
+class LogStore:
+    """Thread-safe ring buffer of the most recent log records"""
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, segment_writer: Optional[SegmentWriter] = None):
+        self.capacity = capacity
+        self._ring: List[Optional[LogEntry]] = [None] * capacity
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._segments = segment_writer
+        if segment_writer is not None:
+            # Segments of several workers interleave, so restore time order
+            rows = sorted(segment_writer.read_tail(capacity), key=lambda row: row[0])
+            for created, levelno, level, source, message in rows:
+                self._append(created, levelno, level, source, message)
+
+    def _append(self, created: float, levelno: int, level: str, source: str, message: str) -> LogEntry:
+        entry = LogEntry(self._next_seq, created, levelno, level, source, message)
+        self._ring[self._next_seq % self.capacity] = entry
+        self._next_seq += 1
+        return entry
+
+    def append(self, created: float, levelno: int, level: str, source: str, message: str):
+        """Store a record (callable from any thread)"""
+        with self._lock:
+            entry = self._append(created, levelno, level, source, message)
+            if self._segments is not None:
+                try:
+                    self._segments.write(entry)
+                except OSError:
+                    pass  # Disk problems must never break logging
+
+    def query(
+        self,
+        limit: int = 100,
+        before: Optional[int] = None,
+        min_level: int = logging.NOTSET,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        contains: Optional[str] = None
+    ) -> Tuple[List[LogEntry], Optional[int]]:
+        """
+        Newest-first records matching the filters
+        Returns (entries, next_cursor); pass next_cursor as `before` for the next (older) page
+        """
+        # Readers don't take the lock: bounds are snapshotted and overwritten slots are skipped
+        newest = self._next_seq - 1
+        oldest = max(0, self._next_seq - self.capacity)
+        start = newest if before is None else min(before - 1, newest)
+        needle = contains.casefold() if contains else None
+
+        results: List[LogEntry] = []
+        seq = start
+        while seq >= oldest:
+            entry = self._ring[seq % self.capacity]
+            seq -= 1
+            if entry is None or entry.seq != seq + 1:
+                continue  # Overwritten while scanning
+            if since is not None and entry.created < since:
+                break  # Records are in time order, nothing older can match
+            if entry.levelno < min_level:
+                continue
+            if source is not None and not entry.source.startswith(source):
+                continue
+            if needle is not None and needle not in entry.message.casefold():
+                continue
+            if len(results) == limit:
+                # One more match exists: the page is full
+                return results, results[-1].seq
+            results.append(entry)
+        return results, None
+
+    def close(self):
+        """Flush and close the current segment file"""
+        with self._lock:
+            if self._segments is not None:
+                self._segments.close()
+
+
+def _create_log_store() -> LogStore:
+    segment_writer = SegmentWriter(LOG_STORE_DIR) if LOG_STORE_DIR else None
+    return LogStore(DEFAULT_CAPACITY, segment_writer)
+
+
+# Global log store instance
+log_store = _create_log_store()
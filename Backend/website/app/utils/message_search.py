@@ -0,0 +1,80 @@
+"""
+Full-text search over chat messages
+- Matches use the GIN index on the generated ChatMessage.searchVector column
+- Results are ranked (ts_rank_cd) and keyset-paginated over (rank, id)
+- Snippets (ts_headline) are only computed for the rows of the returned page
+- The 'simple' parser splits words on spaces and punctuation only: Thai (written without spaces)
+  is not segmented, so a search matches whole space-separated runs of Thai text, not words inside them
+"""
+import html
+from typing import Optional
+
+from sqlalchemy import select, func, tuple_, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChatMessage
+from app.utils.pagination import encode_search_cursor, decode_search_cursor
+
+# Must match the configuration of the searchVector column
+SEARCH_CONFIG = "simple"
+# ts_headline marks matched terms with control characters (removed from the message text first);
+# the snippet is then HTML-escaped and they become <mark>...</mark>, so message text can't inject markup
+START_SEL, STOP_SEL = "\x02", "\x03"
+HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def highlight_snippet(headline: str) -> str:
+    """HTML-safe snippet: escaped message text with matched terms wrapped in <mark>...</mark>"""
+    return html.escape(headline).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+
+
+async def search_messages(
+    db: AsyncSession,
+    q: str,
+    chat_filter,
+    limit: int,
+    cursor: Optional[str] = None
+):
+    """
+    Ranked messages matching q (web search syntax: words, "phrases", OR, -excluded)
+    chat_filter: WHERE clause limiting the chats searched
+    Returns (rows, next_cursor); rows are dicts of the message columns plus rank and snippet
+    """
+    config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+    query = func.websearch_to_tsquery(config, q)
+    rank = func.ts_rank_cd(ChatMessage.searchVector, query)
+
+    matches = (
+        select(
+            ChatMessage.id,
+            ChatMessage.chatId,
+            ChatMessage.userId,
+            ChatMessage.message,
+            ChatMessage.createdAt,
+            ChatMessage.updatedAt,
+            rank.label("rank")
+        )
+        .where(chat_filter, ChatMessage.searchVector.op("@@")(query))
+        .subquery("matches")
+    )
+    page = select(matches)
+    if cursor:
+        page = page.where(tuple_(matches.c.rank, matches.c.id) < tuple_(*decode_search_cursor(cursor)))
+    # Fetch one extra row to know whether another page exists
+    page = (
+        page.order_by(matches.c.rank.desc(), matches.c.id.desc())
+        .limit(limit + 1)
+        .subquery("page")
+    )
+    message_text = func.translate(page.c.message, START_SEL + STOP_SEL, "")
+    result = await db.execute(
+        select(page, func.ts_headline(config, message_text, query, HEADLINE_OPTIONS).label("snippet"))
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].rank, rows[-1].id)
+    return [{**row._mapping, "snippet": highlight_snippet(row.snippet)} for row in rows], next_cursor
@@ -0,0 +1,125 @@
+"""
+In-process request metrics and Prometheus text format rendering
+(single event loop per worker: plain counters, no locking needed)
+With several uvicorn workers each process exposes its own series; scrape every worker
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Dict[str, str]
+Sample = Tuple[Labels, float]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Labels) -> List[Tuple[str, Labels, float]]:
+        rows = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            rows.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        rows.append((f"{name}_bucket", {**labels, "le": "+Inf"}, self.count))
+        rows.append((f"{name}_sum", labels, self.sum))
+        rows.append((f"{name}_count", labels, self.count))
+        return rows
+
+
+class RequestMetrics:
+    """Per-route latency histograms, status counts and in-flight requests"""
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.db_queries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.db_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float):
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        self.responses[(method, route, status_code)] += 1
+
+    def observe_queries(self, method: str, route: str, count: int, seconds: float):
+        """SQL activity of one request (divide by http_requests_total for per-request averages)"""
+        key = (method, route)
+        self.db_queries[key] += count
+        self.db_seconds[key] += seconds
+
+    def render(self) -> str:
+        lines = render_metric(
+            "http_requests_total", "counter", "HTTP responses by route and status",
+            (({"method": m, "route": r, "status": str(s)}, n) for (m, r, s), n in sorted(self.responses.items()))
+        )
+        lines += render_metric(
+            "http_requests_in_flight", "gauge", "HTTP requests currently being served (includes open SSE streams)",
+            [({}, self.in_flight)]
+        )
+        lines += render_metric(
+            "http_request_db_queries_total", "counter", "SQL statements executed by route",
+            (({"method": m, "route": r}, n) for (m, r), n in sorted(self.db_queries.items()))
+        )
+        lines += render_metric(
+            "http_request_db_seconds_total", "counter", "Time spent in SQL statements by route",
+            (({"method": m, "route": r}, n) for (m, r), n in sorted(self.db_seconds.items()))
+        )
+        lines.append("# HELP http_request_duration_seconds HTTP request latency by route")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), histogram in sorted(self.latency.items()):
+            for name, labels, value in histogram.samples("http_request_duration_seconds", {"method": method, "route": route}):
+                lines.append(_format_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def render_metric(name: str, metric_type: str, help_text: str, samples: Iterable[Sample]) -> List[str]:
+    """Prometheus text lines for one metric family"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(_format_sample(name, labels, value) for labels, value in samples)
+    return lines
+
+
+def render_gauge(name: str, help_text: str, value: Optional[float], labels: Optional[Labels] = None) -> List[str]:
+    """Prometheus text lines for a single-sample gauge"""
+    return render_metric(name, "gauge", help_text, [(labels or {}, value or 0)])
+
+
+# Global request metrics (recorded by RequestMetricsMiddleware)
+request_metrics = RequestMetrics()
@@ -0,0 +1,68 @@
+"""
+Allowed-origin policy (CORS), shared by the CORS middleware and the exception handlers
+Rules are compiled once at startup; lookups are memoised in an LRU of seen origins
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Exact origins (comma-separated) and a regex for everything else (full match)
+# Defaults: local dev servers, and the frontend/API ports on private network IPs
+# (192.168.x.x, 10.x.x.x, 172.16-31.x.x)
+DEFAULT_ORIGINS = "http://localhost:3000,http://localhost:3001,http://127.0.0.1:3000,http://127.0.0.1:3001"
+DEFAULT_ORIGIN_REGEX = (
+    r"http://(192\.168\.\d+\.\d+|10\.\d+\.\d+\.\d+|172\.(1[6-9]|2[0-9]|3[0-1])\.\d+\.\d+):(3000|3001|8000)"
+)
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", DEFAULT_ORIGINS)
+CORS_ORIGIN_REGEX = os.getenv("CORS_ORIGIN_REGEX", DEFAULT_ORIGIN_REGEX)
+# Distinct origins remembered (browsers send a handful; the cap bounds memory against junk headers)
+CORS_ORIGIN_CACHE_SIZE = int(os.getenv("CORS_ORIGIN_CACHE_SIZE", "1024"))
+
+
+class OriginMatcher:
+    """Precompiled origin rules with a memoised lookup"""
+    def __init__(self, origins: Iterable[str], pattern: Optional[str] = None, cache_size: int = CORS_ORIGIN_CACHE_SIZE):
+        self.origins = frozenset(origin.strip() for origin in origins if origin.strip())
+        self.pattern = pattern or None
+        self._regex = re.compile(self.pattern) if self.pattern else None
+        self._lookup = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, origin: str) -> bool:
+        if origin in self.origins:
+            return True
+        return self._regex is not None and self._regex.fullmatch(origin) is not None
+
+    def is_allowed(self, origin: Optional[str]) -> bool:
+        """Check if an Origin header value is allowed"""
+        if not origin:
+            return False
+        return self._lookup(origin)
+
+    def cache_info(self):
+        return self._lookup.cache_info()
+
+
+class MatcherCORSMiddleware(CORSMiddleware):
+    """Starlette CORSMiddleware that decides origins with an OriginMatcher"""
+    def __init__(self, app: ASGIApp, matcher: OriginMatcher, **kwargs):
+        super().__init__(
+            app,
+            allow_origins=sorted(matcher.origins),
+            allow_origin_regex=matcher.pattern,
+            **kwargs
+        )
+        self.matcher = matcher
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        return self.matcher.is_allowed(origin)
+
+
+# Global origin policy
+origin_matcher = OriginMatcher(CORS_ORIGINS.split(","), CORS_ORIGIN_REGEX)
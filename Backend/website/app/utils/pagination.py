@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination utilities
+Cursors are opaque to clients: base64url of "<position>|<id>"
+- message history: position is createdAt (ISO)
+- search results: position is the rank (float repr, round-trips exactly)
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException, status
+
+
+def _encode(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> Tuple[str, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+    position, row_id = raw.rsplit("|", 1)
+    return position, int(row_id)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor"
+    )
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (createdAt, id) position into an opaque cursor"""
+    return _encode(f"{created_at.isoformat()}|{row_id}")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor back into a (createdAt, id) position"""
+    try:
+        created_at, row_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeError):
+        raise _invalid_cursor()
+
+
+def encode_search_cursor(rank: float, row_id: int) -> str:
+    """Encode a (rank, id) search result position into an opaque cursor"""
+    return _encode(f"{rank!r}|{row_id}")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode an opaque search cursor back into a (rank, id) position"""
+    try:
+        rank, row_id = _decode(cursor)
+        return float(rank), row_id
+    except (ValueError, UnicodeError):
+        raise _invalid_cursor()
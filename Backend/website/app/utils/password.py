@@ -4,23 +4,174 @@ Optimized for high concurrency
 """
 import bcrypt
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from functools import partial
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
 
-# Thread pool for CPU-intensive password operations
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use: its CPU affinity (taskset, cpusets) capped by a
+    cgroup v2 CPU quota (docker --cpus, Kubernetes limits); os.cpu_count() counts the whole host
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1  # No sched_getaffinity (macOS, Windows)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass  # No cgroup v2 CPU limit
+    return cpus
+
+
+# Worker pool for CPU-intensive password operations
 # This prevents blocking the event loop during password hashing
-# Increased workers for 70+ concurrent logins
-# Formula: (CPU cores * 2) + 1, but for 70 concurrent logins, we need more
-_password_executor = ThreadPoolExecutor(max_workers=20, thread_name_prefix="password")
+# bcrypt releases the GIL while hashing, so one thread per usable core saturates the CPU;
+# more threads only add contention and make every login slower
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(available_cpus())))
+# Max operations waiting for a worker; beyond that requests are rejected with 503 + Retry-After
+# Default: ~16 hashes per worker (~1-2s of queueing at rounds=10)
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", str(PASSWORD_WORKERS * 16)))
+# thread:  worker threads in this process (bcrypt releases the GIL)
+# process: dedicated hashing processes, so hashing never competes with the event loop for this
+#          process's CPU time/GIL (costs a pickle round-trip per call, workers started at app startup)
+PASSWORD_BACKEND = os.getenv("PASSWORD_BACKEND", "thread").lower()
+
+
+def _timed_call(func, *args):
+    """Run func in a worker and report how long it took"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _warm_worker() -> int:
+    """Start-up task: loads bcrypt in the worker (one cheap hash) so the first login doesn't pay for it"""
+    bcrypt.hashpw(b"warm", bcrypt.gensalt(rounds=4))
+    return os.getpid()
+
+
+def create_password_executor(backend: str, workers: int) -> Executor:
+    """Create the executor selected by PASSWORD_BACKEND"""
+    if backend == "process":
+        # spawn: forking a worker that already runs an event loop and DB connections is unsafe
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    if backend != "thread":
+        raise ValueError(f"Unknown PASSWORD_BACKEND: {backend!r} (expected 'thread' or 'process')")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+
+
+class PasswordPool:
+    """Bounded worker pool with queue-depth admission control and latency metrics"""
+    # Smoothing factor for the moving averages
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, executor: Executor, workers: int, max_queue: int, backend: str = "thread"):
+        self.executor = executor
+        self.backend = backend
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0  # Running + waiting operations
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.avg_run_seconds = 0.08  # bcrypt rounds=10 on a typical core
+        self.avg_wait_seconds = 0.0
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        return max(1, math.ceil(self.in_flight / self.workers * self.avg_run_seconds))
+
+    async def run(self, func, *args):
+        """Run a password operation, rejecting fast when the queue is full"""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, run_seconds = await loop.run_in_executor(self.executor, _timed_call, func, *args)
+        finally:
+            self.in_flight -= 1
+
+        wait_seconds = max(0.0, time.perf_counter() - submitted - run_seconds)
+        self.completed += 1
+        self.avg_run_seconds += self.EWMA_ALPHA * (run_seconds - self.avg_run_seconds)
+        self.avg_wait_seconds += self.EWMA_ALPHA * (wait_seconds - self.avg_wait_seconds)
+        return result
+
+    async def start(self):
+        """Warm start: bring every worker up before the first login (call at app startup)"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_worker) for _ in range(self.workers)))
+
+    def shutdown(self):
+        """Stop the workers (queued operations are cancelled)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_run_ms": round(self.avg_run_seconds * 1000, 2),
+            "avg_wait_ms": round(self.avg_wait_seconds * 1000, 2),
+        }
+
+
+_password_pool = PasswordPool(
+    create_password_executor(PASSWORD_BACKEND, PASSWORD_WORKERS),
+    workers=PASSWORD_WORKERS,
+    max_queue=PASSWORD_MAX_QUEUE,
+    backend=PASSWORD_BACKEND,
+)
+
+
+async def start_password_pool():
+    """Start the password workers (app startup)"""
+    await _password_pool.start()
+
+
+def stop_password_pool():
+    """Stop the password workers (app shutdown)"""
+    _password_pool.shutdown()
+
+
+def get_password_pool_stats() -> dict:
+    """Password worker pool depth/latency metrics"""
+    return _password_pool.stats()
 
 
 def _hash_password_sync(password: str) -> str:
-    """Synchronous password hashing (runs in thread pool)"""
+    """Synchronous password hashing (runs in worker pool)"""
     # Bcrypt has a 72 byte limit, so we'll truncate if necessary
     password_bytes = password.encode('utf-8')
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
-    
+
     # Generate salt and hash
     # Using rounds=10 for better performance with high concurrency
     # Still secure but faster (70+ concurrent logins)
@@ -30,12 +181,12 @@ def _hash_password_sync(password: str) -> str:
 
 
 def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
-    """Synchronous password verification (runs in thread pool)"""
+    """Synchronous password verification (runs in worker pool)"""
     try:
         password_bytes = plain_password.encode('utf-8')
         if len(password_bytes) > 72:
             password_bytes = password_bytes[:72]
-        
+
         hashed_bytes = hashed_password.encode('utf-8')
         return bcrypt.checkpw(password_bytes, hashed_bytes)
     except Exception:
@@ -43,9 +194,8 @@ def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
 
 
 async def hash_password(password: str) -> str:
-    """Hash a password using bcrypt (async, non-blocking)"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(_password_executor, _hash_password_sync, password)
+    """Hash a password using bcrypt (async, non-blocking; 503 when the pool is saturated)"""
+    return await _password_pool.run(_hash_password_sync, password)
 
 
 def hash_password_sync(password: str) -> str:
@@ -54,14 +204,8 @@ def hash_password_sync(password: str) -> str:
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash (async, non-blocking)"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        _password_executor, 
-        _verify_password_sync, 
-        plain_password, 
-        hashed_password
-    )
+    """Verify a password against a hash (async, non-blocking; 503 when the pool is saturated)"""
+    return await _password_pool.run(_verify_password_sync, plain_password, hashed_password)
 
 
 def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
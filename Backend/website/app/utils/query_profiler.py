@@ -0,0 +1,75 @@
+"""
+Per-request SQL profiling (query count, total DB time, slowest statement)
+Cursor events on the engines add to the QueryStats of the current request (a context variable
+set by QueryProfilerMiddleware); queries outside a request are not tracked
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# SQL_PROFILING=false disables the cursor hooks entirely
+SQL_PROFILING = os.getenv("SQL_PROFILING", "true").lower() == "true"
+# SQL_SERVER_TIMING=true adds the Server-Timing header to every response (development / benchmarking only:
+# it tells any client how much DB work a request did)
+SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "false").lower() == "true"
+# Requests running more queries than this are logged as N+1 suspects
+SQL_QUERY_COUNT_THRESHOLD = int(os.getenv("SQL_QUERY_COUNT_THRESHOLD", "20"))
+# Requests whose slowest statement exceeds this (milliseconds) are logged too
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+
+
+class QueryStats:
+    """SQL activity of one request"""
+    __slots__ = ("count", "total_seconds", "slowest_seconds", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def exceeds_thresholds(self) -> bool:
+        return self.count > SQL_QUERY_COUNT_THRESHOLD or self.slowest_seconds * 1000 > SQL_SLOW_QUERY_MS
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (shown per request in browser devtools)"""
+        return f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_query_stats.get() is not None:
+        context._profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    start = getattr(context, "_profiler_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def install_query_profiler(*engines: Engine):
+    """Attach the cursor hooks (pass AsyncEngine.sync_engine for async engines)"""
+    if not SQL_PROFILING:
+        return
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,27 @@
+"""
+JSON responses rendered with orjson (default response class of the app)
+orjson encodes datetimes natively and several times faster than json.dumps
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson
+    OPT_UTC_Z: UTC datetimes end in "Z", like Pydantic's JSON output
+    OPT_NON_STR_KEYS: int-keyed maps (e.g. sideloaded users) are allowed
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def row_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Render a payload that is already in response shape (built from SQL rows), skipping response_model
+    validation; keeps headers set on the endpoint's Response parameter (ETag, cursors)
+    """
+    return FastJSONResponse(content, headers=dict(response.headers) if response is not None else None)
@@ -0,0 +1,101 @@
+"""
+Response payloads built straight from SQL row tuples (list endpoints)
+Select the *_COLUMNS below and turn each row into the dict the response schema would produce,
+without loading ORM objects or validating a Pydantic model per item
+Keep the keys in step with app/schemas (same names and order as the schema's JSON output)
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User, Credential, Chat, ChatMessage, chat_users
+
+# UserResponse (with its credential, outer joined on Credential.userId == User.id)
+USER_COLUMNS = (
+    User.id, User.email, User.firstName, User.lastName, User.emailVerified, User.isApproved, User.role,
+    User.createdAt, User.updatedAt,
+    Credential.id, Credential.username, Credential.createdAt, Credential.updatedAt,
+)
+# ChatMessageResponse without the sender
+MESSAGE_COLUMNS = (
+    ChatMessage.id, ChatMessage.chatId, ChatMessage.userId, ChatMessage.message,
+    ChatMessage.createdAt, ChatMessage.updatedAt,
+)
+# ChatResponse without the users
+CHAT_COLUMNS = (
+    Chat.id, Chat.name, Chat.createdAt, Chat.updatedAt, Chat.lastUsed, Chat.messageCount, Chat.lastMessageId,
+)
+
+
+def user_payload(row, start: int = 0) -> dict:
+    """UserResponse from USER_COLUMNS at row[start:]"""
+    (
+        user_id, email, first_name, last_name, email_verified, is_approved, role, created_at, updated_at,
+        credential_id, username, credential_created_at, credential_updated_at
+    ) = row[start:start + len(USER_COLUMNS)]
+    return {
+        "email": email,
+        "id": user_id,
+        "firstName": first_name,
+        "lastName": last_name,
+        "emailVerified": email_verified,
+        "isApproved": is_approved,
+        "role": role,
+        "credential": None if credential_id is None else {
+            "username": username,
+            "id": credential_id,
+            "userId": user_id,
+            "createdAt": credential_created_at,
+            "updatedAt": credential_updated_at,
+        },
+        "createdAt": created_at,
+        "updatedAt": updated_at,
+    }
+
+
+def message_payload(row) -> dict:
+    """ChatMessageResponse fields from MESSAGE_COLUMNS (sender added by the caller)"""
+    message_id, chat_id, user_id, message, created_at, updated_at = row[:len(MESSAGE_COLUMNS)]
+    return {
+        "message": message,
+        "id": message_id,
+        "chatId": chat_id,
+        "userId": user_id,
+        "createdAt": created_at,
+        "updatedAt": updated_at,
+    }
+
+
+def chat_payload(row) -> dict:
+    """ChatResponse fields from CHAT_COLUMNS (users / userIds added by the caller)"""
+    chat_id, name, created_at, updated_at, last_used, message_count, last_message_id = row[:len(CHAT_COLUMNS)]
+    return {
+        "name": name,
+        "id": chat_id,
+        "createdAt": created_at,
+        "updatedAt": updated_at,
+        "lastUsed": last_used,
+        "messageCount": message_count,
+        "lastMessageId": last_message_id,
+    }
+
+
+async def chat_member_payloads(db: AsyncSession, chat_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """UserResponse payloads of the members of each chat, in one query"""
+    chat_ids = list(chat_ids)
+    members: Dict[int, List[dict]] = defaultdict(list)
+    if not chat_ids:
+        return members
+
+    result = await db.execute(
+        select(chat_users.c.chatId, *USER_COLUMNS)
+        .join(User, User.id == chat_users.c.userId)
+        .outerjoin(Credential, Credential.userId == User.id)
+        .where(chat_users.c.chatId.in_(chat_ids))
+        .order_by(chat_users.c.chatId, chat_users.c.joinedAt, User.id)
+    )
+    for row in result:
+        members[row[0]].append(user_payload(row, 1))
+    return members
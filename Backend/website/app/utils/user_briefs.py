@@ -0,0 +1,43 @@
+"""
+Compact user references for list payloads (?compact=true)
+Items carry user ids only; the response carries each referenced user once in a "users" map
+({id: {id, displayName}}), read from User alone: no Credential join, no per-item user objects
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User, chat_users
+
+# "First Last", falling back to the local part of the email when both names are empty
+display_name = func.coalesce(
+    func.nullif(func.trim(func.concat_ws(" ", User.firstName, User.lastName)), ""),
+    func.split_part(User.email, "@", 1)
+).label("displayName")
+
+
+def user_brief(user_id: int, name: str) -> dict:
+    return {"id": user_id, "displayName": name}
+
+
+async def chat_member_briefs(db: AsyncSession, chat_ids: Iterable[int]) -> Tuple[Dict[int, List[int]], Dict[int, dict]]:
+    """Member ids per chat and the users map for them, in one narrow query"""
+    chat_ids = list(chat_ids)
+    member_ids: Dict[int, List[int]] = defaultdict(list)
+    users: Dict[int, dict] = {}
+    if not chat_ids:
+        return member_ids, users
+
+    result = await db.execute(
+        select(chat_users.c.chatId, User.id, display_name)
+        .join(User, User.id == chat_users.c.userId)
+        .where(chat_users.c.chatId.in_(chat_ids))
+        .order_by(chat_users.c.chatId, chat_users.c.joinedAt, User.id)
+    )
+    for chat_id, user_id, name in result:
+        member_ids[chat_id].append(user_id)
+        users[user_id] = user_brief(user_id, name)
+    return member_ids, users
+
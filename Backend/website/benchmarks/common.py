@@ -0,0 +1,48 @@
+"""
+Helpers shared by the benchmark scripts (percentiles, result files)
+"""
+import datetime
+import json
+import subprocess
+from typing import Iterable, Optional
+
+
+def percentile(values, pct) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: Iterable[float]) -> dict:
+    """p50/p95/p99/max in milliseconds from latencies in seconds"""
+    latencies = list(latencies)
+    summary = {}
+    for name, pct in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99), ("max_ms", 100)):
+        value = percentile(latencies, pct)
+        summary[name] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+
+def git_revision() -> Optional[str]:
+    """Short commit hash of the checkout (None outside a git checkout)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, results, **meta):
+    """Write results as JSON, tagged with the commit and time so runs can be compared"""
+    document = {
+        "commit": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        **meta,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
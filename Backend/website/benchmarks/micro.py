@@ -0,0 +1,329 @@
+"""
+Micro-benchmarks: response serialisation, token verification, origin matching and router queries
+
+Groups (--only to pick some):
+- serialise: ChatResponse / ChatMessageResponse / UserResponse pages, no database:
+             ORM objects through FastAPI's response path (response_model validation + JSON rendering,
+             stdlib json and orjson) vs. the row fast path (row tuples -> dicts -> orjson)
+- token:     verify_token, cached and uncached (signature check)
+- origin:    origin_matcher.is_allowed (memoised) and the uncached rule match
+- router:    each read endpoint called in-process (no network, no server) against the DATABASE_URL
+             database; reports request time and the DB time from the Server-Timing header
+             (SQL_SERVER_TIMING is switched on for this process)
+Seed the database first for meaningful router numbers (benchmarks/seed.py; reference size: 10k users,
+1k chats, 1M messages).
+The router group benchmarks the member of the busiest chat.
+
+Usage (from Backend/website):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --only serialise token origin
+    python -m benchmarks.micro --only router --rounds 200 --output micro.json
+"""
+import argparse
+import asyncio
+import inspect
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+
+from benchmarks.common import percentile, write_results
+
+# Before the app is imported: the router group reads DB time from the Server-Timing header
+os.environ.setdefault("SQL_SERVER_TIMING", "true")
+
+from app.database import AsyncSessionLocal
+from app.models import User, Credential, Chat, ChatMessage, chat_users
+from app.schemas.chat import ChatResponse
+from app.schemas.chat_message import ChatMessageResponse
+from app.schemas.user import UserResponse
+from app.utils import jwt as jwt_utils
+from app.utils.origins import origin_matcher
+from app.utils.pagination import encode_cursor
+from app.utils.responses import FastJSONResponse
+from app.utils.row_payloads import MESSAGE_COLUMNS, chat_payload, message_payload, user_payload
+
+GROUPS = ("serialise", "token", "origin", "router")
+
+
+async def measure(func, number: int, repeat: int) -> list:
+    """Seconds per call, one sample per repeat (each the mean of number back-to-back calls)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = func()
+            if inspect.isawaitable(result):
+                await result
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def summarise(group: str, name: str, samples: list, number: int, **extra) -> dict:
+    result = {
+        "group": group,
+        "name": name,
+        "calls": number * len(samples),
+        "best_us": round(min(samples) * 1e6, 2),
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "p95_us": round(percentile(samples, 95) * 1e6, 2),
+        **extra,
+    }
+    print(f"{group:>9} {name:<56} median={result['median_us']:>11}us best={result['best_us']:>11}us")
+    return result
+
+
+# Serialisation: in-memory ORM objects shaped like the real pages
+
+def _user(n: int, now: datetime) -> User:
+    return User(
+        id=n, email=f"user{n}@example.com", firstName="First", lastName=f"Last{n}",
+        emailVerified=True, isApproved=True, role="user", createdAt=now, updatedAt=now,
+        credential=Credential(id=n, userId=n, username=f"user{n}", createdAt=now, updatedAt=now)
+    )
+
+
+def _sample_objects():
+    now = datetime.now(timezone.utc)
+    users = [_user(n, now) for n in range(1, 101)]
+    chats = [
+        Chat(
+            id=n, name=f"Chat {n}", createdAt=now, updatedAt=now, lastUsed=now,
+            messageCount=1000, lastMessageId=n * 1000, users=users[n % 20 * 5:n % 20 * 5 + 5]
+        )
+        for n in range(1, 51)
+    ]
+    messages = [
+        ChatMessage(
+            id=n, chatId=1, userId=users[n % 5].id, message=f"Message number {n} in a typical chat " * 2,
+            createdAt=now, updatedAt=now, sender=users[n % 5]
+        )
+        for n in range(1, 101)
+    ]
+    return users, chats, messages
+
+
+def _response_path(model, objects, response_class=JSONResponse):
+    """What FastAPI does with a list endpoint's return value: validate against response_model, render JSON"""
+    field = create_response_field(name="response", type_=List[model])
+
+    async def render():
+        content = await serialize_response(field=field, response_content=objects, is_coroutine=True)
+        return response_class(content).body
+
+    return render
+
+
+def _user_row(user: User) -> tuple:
+    credential = user.credential
+    return (
+        user.id, user.email, user.firstName, user.lastName, user.emailVerified, user.isApproved, user.role,
+        user.createdAt, user.updatedAt, credential.id, credential.username, credential.createdAt, credential.updatedAt
+    )
+
+
+def _row_paths(users, chats, messages) -> dict:
+    """The row fast path (app/utils/row_payloads.py) on row tuples equivalent to the ORM objects"""
+    user_rows = [_user_row(user) for user in users]
+    message_rows = [
+        (m.id, m.chatId, m.userId, m.message, m.createdAt, m.updatedAt, *_user_row(m.sender)) for m in messages
+    ]
+    chat_rows = [
+        ((c.id, c.name, c.createdAt, c.updatedAt, c.lastUsed, c.messageCount, c.lastMessageId),
+         [_user_row(user) for user in c.users])
+        for c in chats
+    ]
+
+    def message_page():
+        page = []
+        for row in message_rows:
+            message = message_payload(row)
+            message["sender"] = user_payload(row, len(MESSAGE_COLUMNS))
+            page.append(message)
+        return FastJSONResponse(page).body
+
+    def chat_list():
+        page = []
+        for row, members in chat_rows:
+            chat = chat_payload(row)
+            chat["users"] = [user_payload(member) for member in members]
+            page.append(chat)
+        return FastJSONResponse(page).body
+
+    def user_list():
+        return FastJSONResponse([user_payload(row) for row in user_rows]).body
+
+    return {"message page": message_page, "chat list": chat_list, "user list": user_list}
+
+
+async def bench_serialise(args) -> list:
+    users, chats, messages = _sample_objects()
+    row_paths = _row_paths(users, chats, messages)
+    cases = [
+        ("message page", "ChatMessageResponse x100", ChatMessageResponse, messages),
+        ("chat list", "ChatResponse x50 (5 users each)", ChatResponse, chats),
+        ("user list", "UserResponse x100", UserResponse, users),
+    ]
+    number = args.number // 100 or 1
+    results = []
+    for page, name, model, objects in cases:
+        for label, render in (
+            ("models + json", _response_path(model, objects)),
+            ("models + orjson", _response_path(model, objects, FastJSONResponse)),
+            ("rows + orjson", row_paths[page]),
+        ):
+            samples = await measure(render, number, args.repeat)
+            results.append(summarise("serialise", f"{name}: {label}", samples, number, page=page, path=label))
+    return results
+
+
+async def bench_token(args) -> list:
+    token = jwt_utils.create_access_token({"sub": "user1@example.com"})
+
+    def uncached():
+        jwt_utils._token_cache.clear()
+        return jwt_utils.verify_token(token)
+
+    return [
+        summarise("token", "verify_token (cached)", await measure(lambda: jwt_utils.verify_token(token), args.number, args.repeat), args.number),
+        summarise("token", "verify_token (uncached)", await measure(uncached, args.number // 10 or 1, args.repeat), args.number // 10 or 1),
+    ]
+
+
+async def bench_origin(args) -> list:
+    cases = [
+        ("is_allowed exact (memoised)", lambda: origin_matcher.is_allowed("http://localhost:3000")),
+        ("is_allowed regex (memoised)", lambda: origin_matcher.is_allowed("http://192.168.1.20:3000")),
+        ("rule match exact (uncached)", lambda: origin_matcher._match("http://localhost:3000")),
+        ("rule match regex (uncached)", lambda: origin_matcher._match("http://192.168.1.20:3000")),
+        ("rule match rejected (uncached)", lambda: origin_matcher._match("https://evil.example.com")),
+    ]
+    return [summarise("origin", name, await measure(func, args.number, args.repeat), args.number) for name, func in cases]
+
+
+# Router queries: in-process requests against the seeded database
+
+async def _sample_context() -> dict:
+    """Busiest chat, one of its members and a cursor halfway through its history"""
+    async with AsyncSessionLocal() as db:
+        chat = (await db.execute(
+            select(Chat.id, Chat.messageCount).order_by(Chat.messageCount.desc()).limit(1)
+        )).first()
+        if chat is None:
+            raise SystemExit("router benchmarks need a seeded database (no chats found)")
+        user = (await db.execute(
+            select(User.id, User.email)
+            .join(chat_users, chat_users.c.userId == User.id)
+            .where(chat_users.c.chatId == chat.id)
+            .limit(1)
+        )).first()
+        middle = (await db.execute(
+            select(ChatMessage.createdAt, ChatMessage.id)
+            .where(ChatMessage.chatId == chat.id)
+            .order_by(ChatMessage.createdAt.desc(), ChatMessage.id.desc())
+            .offset(chat.messageCount // 2)
+            .limit(1)
+        )).first()
+    return {
+        "chat_id": chat.id,
+        "user_id": user.id,
+        "headers": {"Authorization": f"Bearer {jwt_utils.create_access_token({'sub': user.email})}"},
+        "middle_cursor": encode_cursor(*middle) if middle else None,
+    }
+
+
+def _server_timing(response: httpx.Response) -> tuple:
+    """(DB milliseconds, query count) from the Server-Timing header (db;dur=<ms>;desc="<n> queries")"""
+    duration, count = 0.0, 0
+    for part in response.headers.get("server-timing", "").split(";"):
+        if part.startswith("dur="):
+            duration = float(part[4:])
+        elif part.startswith("desc="):
+            count = int(part[5:].strip('"').split()[0])
+    return duration, count
+
+
+async def bench_router(args) -> list:
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        context = await _sample_context()
+        chat_id = context["chat_id"]
+        endpoints = [
+            ("GET /auth/me", "/auth/me", {}),
+            ("GET /chats", "/chats", {}),
+            ("GET /chats/summary", "/chats/summary", {}),
+            ("GET /chats/{chat_id}", f"/chats/{chat_id}", {}),
+            ("GET /chats/{chat_id}/users", f"/chats/{chat_id}/users", {}),
+            ("GET /chats/{chat_id}/messages (newest)", f"/chats/{chat_id}/messages", {"limit": 100}),
+            ("GET /chats/{chat_id}/messages (deep page)", f"/chats/{chat_id}/messages",
+             {"limit": 100, "before": context["middle_cursor"]} if context["middle_cursor"] else {"limit": 100}),
+            ("GET /chats/{chat_id}/messages/search", f"/chats/{chat_id}/messages/search", {"q": args.search}),
+            ("GET /chats/messages/search", "/chats/messages/search", {"q": args.search}),
+            ("GET /users", "/users", {"limit": 100}),
+            ("GET /users/{user_id}", f"/users/{context['user_id']}", {}),
+        ]
+
+        results = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=context["headers"]) as client:
+            for name, path, params in endpoints:
+                db_times = []
+                query_counts = set()
+
+                async def request():
+                    response = await client.get(path, params=params)
+                    response.raise_for_status()
+                    db_ms, count = _server_timing(response)
+                    db_times.append(db_ms)
+                    query_counts.add(count)
+
+                await request()  # Warm caches (principal, statement cache, buffers)
+                db_times.clear()
+                samples = await measure(request, 1, args.rounds)
+                results.append(summarise(
+                    "router", name, samples, 1,
+                    db_median_ms=round(statistics.median(db_times), 3),
+                    queries=sorted(query_counts),
+                ))
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+RUNNERS = {
+    "serialise": bench_serialise,
+    "token": bench_token,
+    "origin": bench_origin,
+    "router": bench_router,
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--number", type=int, default=10000, help="Calls per sample for in-memory benchmarks")
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per in-memory benchmark")
+    parser.add_argument("--rounds", type=int, default=100, help="Requests per router benchmark")
+    parser.add_argument("--search", default="hello", help="Search term for the search endpoints")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for group in args.only:
+        results.extend(await RUNNERS[group](args))
+
+    if args.output:
+        write_results(args.output, results, benchmark="micro")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark: password hashing backends (thread vs process) under concurrent logins
+
+Each "login" is one verify_password call against a stored bcrypt hash, all fired at once.
+Also measures event-loop lag (how late a 10ms ticker wakes up), i.e. how much hashing
+slows down everything else the worker is serving.
+
+Usage (from Backend/website):
+    python -m benchmarks.password_pool
+    python -m benchmarks.password_pool --concurrency 10 50 200 --workers 4 --output results.json
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from benchmarks.common import percentile, write_results
+from app.utils.password import (
+    PASSWORD_WORKERS,
+    PasswordPool,
+    _hash_password_sync,
+    _verify_password_sync,
+    create_password_executor,
+)
+
+TICK_SECONDS = 0.01
+
+
+async def _measure_loop_lag(stop: asyncio.Event, lags: list):
+    """Record how late each tick fires"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+async def _login(pool: PasswordPool, password: str, hashed: str):
+    start = time.perf_counter()
+    try:
+        ok = await pool.run(_verify_password_sync, password, hashed)
+    except HTTPException:
+        return None
+    assert ok
+    return time.perf_counter() - start
+
+
+async def run_case(backend: str, workers: int, concurrency: int, hashed: str) -> dict:
+    # Queue sized to the burst: this compares raw backend latency, not admission control
+    pool = PasswordPool(create_password_executor(backend, workers), workers, concurrency, backend)
+    try:
+        await pool.start()
+        stop = asyncio.Event()
+        lags: list = []
+        ticker = asyncio.create_task(_measure_loop_lag(stop, lags))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(_login(pool, "benchmark-password", hashed) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await ticker
+    finally:
+        pool.shutdown()
+
+    latencies = [r for r in results if r is not None]
+    return {
+        "backend": backend,
+        "workers": workers,
+        "concurrency": concurrency,
+        "completed": len(latencies),
+        "rejected": concurrency - len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "loop_lag_mean_ms": round(statistics.fmean(lags) * 1000, 2) if lags else None,
+        "loop_lag_max_ms": round(max(lags) * 1000, 2) if lags else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--workers", type=int, default=PASSWORD_WORKERS)
+    parser.add_argument("--backends", nargs="+", default=["thread", "process"])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    hashed = _hash_password_sync("benchmark-password")
+    results = []
+    for concurrency in args.concurrency:
+        for backend in args.backends:
+            result = await run_case(backend, args.workers, concurrency, hashed)
+            results.append(result)
+            print(
+                f"{backend:>7} c={concurrency:<4} {result['logins_per_s']:>7}/s  "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms  "
+                f"loop lag mean={result['loop_lag_mean_ms']}ms max={result['loop_lag_max_ms']}ms"
+            )
+
+    if args.output:
+        write_results(args.output, results, benchmark="password_pool")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
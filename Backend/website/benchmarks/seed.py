@@ -0,0 +1,290 @@
+"""
+Deterministic bulk seeder: users, credentials, chats, members and messages via Postgres COPY
+
+The same arguments (including --seed) always produce the same rows. Rows are appended after the
+highest existing ids and the id sequences are moved past them, so it can run on a database that
+already has data; --truncate empties the five tables first.
+Every synthetic user shares one precomputed bcrypt hash of --password (log in as seed-<n>@example.com).
+
+Distribution:
+- chat sizes: 2 .. --max-members members, skewed towards direct messages and small groups
+- messages per chat: Zipf-like (--skew), so a few busy chats hold most of the history
+- timestamps: spread over the --days before --end, in order within each chat
+- read state: --unread-ratio of the members are a few messages behind, the rest are caught up
+The chat summary columns (message count, last message) are filled from the copied messages afterwards.
+
+Usage (from Backend/website, DATABASE_URL set):
+    python -m benchmarks.seed --users 10000 --chats 1000 --messages 1000000
+    python -m benchmarks.seed --users 200 --chats 20 --messages 20000 --truncate
+"""
+import argparse
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.database import engine
+from app.utils.chat_summary import MESSAGE_PREVIEW_LENGTH
+from app.utils.password import _hash_password_sync
+
+COPY_CHUNK_ROWS = 50000
+
+FIRST_NAMES = (
+    "Anan", "Ploy", "Krit", "Mali", "Niran", "Pim", "Somchai", "Dao", "Arthit", "Fah",
+    "Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Robin", "Jamie", "Chris", "Kim",
+)
+LAST_NAMES = (
+    "Srisuk", "Chaiyaporn", "Wongsawat", "Rattanakul", "Boonmee", "Suwannarat", "Thongdee",
+    "Smith", "Garcia", "Chen", "Nguyen", "Kowalski", "Tanaka", "Silva", "Muller", "Haddad",
+)
+WORDS = (
+    "hello", "hi", "thanks", "ok", "sure", "meeting", "today", "tomorrow", "lunch", "project",
+    "deadline", "update", "please", "check", "the", "a", "this", "that", "report", "draft",
+    "review", "call", "later", "now", "sounds", "good", "great", "done", "working", "on",
+    "issue", "fix", "deploy", "server", "database", "query", "slow", "fast", "chat", "message",
+    "can", "you", "we", "I", "will", "send", "file", "link", "see", "attached",
+    "morning", "afternoon", "evening", "week", "next", "last", "time", "schedule", "room", "office",
+    "coffee", "break", "team", "client", "design", "test", "release", "version", "bug", "feature",
+    "question", "answer", "idea", "plan", "budget", "invoice", "order", "shipping", "price", "discount",
+)
+TOPICS = ("Project", "Team", "Support", "Sales", "Design", "Ops", "Lunch", "Random", "Release", "Planning")
+
+
+def _copy_value(value) -> str:
+    """One value in COPY text format"""
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return str(value)
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows) -> int:
+    """Stream rows into a table with COPY, COPY_CHUNK_ROWS at a time (memory stays flat)"""
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    sql = f'COPY "{table}" ({column_list}) FROM STDIN'
+    buffer = io.StringIO()
+    pending = total = 0
+    for row in rows:
+        buffer.write("\t".join(map(_copy_value, row)))
+        buffer.write("\n")
+        pending += 1
+        if pending == COPY_CHUNK_ROWS:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += pending
+            buffer = io.StringIO()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += pending
+    return total
+
+
+def _next_id(cursor, table: str) -> int:
+    cursor.execute(f'SELECT COALESCE(MAX("id"), 0) + 1 FROM "{table}"')
+    return cursor.fetchone()[0]
+
+
+def _sync_sequence(cursor, table: str):
+    """Move the id sequence past the copied ids (COPY doesn't use nextval)"""
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT MAX(\"id\") FROM \"{table}\"))"
+    )
+
+
+class SeedPlan:
+    """Everything decided up front (chat members, message counts, time windows) from one seeded RNG"""
+    def __init__(self, args, first_user_id: int, first_chat_id: int, first_message_id: int):
+        rng = random.Random(args.seed)
+        self.args = args
+        self.end = args.end
+        self.start = args.end - timedelta(days=args.days)
+        self.user_ids = range(first_user_id, first_user_id + args.users)
+        self.chat_ids = range(first_chat_id, first_chat_id + args.chats)
+
+        # Chat sizes: mostly 2 (direct messages), long tail of bigger groups
+        max_members = min(args.max_members, args.users)
+        self.members = []
+        for _ in self.chat_ids:
+            size = min(max_members, max(2, int(rng.paretovariate(1.2) * 1.5)))
+            self.members.append(rng.sample(self.user_ids, size))
+
+        # Message counts: Zipf-like weights, shuffled so busy chats aren't just the first ids
+        weights = [1 / (rank + 1) ** args.skew for rank in range(args.chats)]
+        rng.shuffle(weights)
+        scale = args.messages / sum(weights)
+        self.message_counts = [int(weight * scale) for weight in weights]
+        self.message_counts[weights.index(max(weights))] += args.messages - sum(self.message_counts)
+
+        # Messages are copied chat by chat, so each chat's message ids are one contiguous range
+        self.first_message_ids = []
+        next_message_id = first_message_id
+        for count in self.message_counts:
+            self.first_message_ids.append(next_message_id)
+            next_message_id += count
+
+        # Each chat is active from some point in the window until the end
+        span = (self.end - self.start).total_seconds()
+        self.chat_starts = [self.start + timedelta(seconds=rng.random() * span * 0.9) for _ in self.chat_ids]
+
+    def _user_created(self):
+        """Creation time of each user, in user_ids order (a credential is created with its user)"""
+        rng = random.Random(self.args.seed + 2)
+        for _ in self.user_ids:
+            yield self.start - timedelta(days=rng.randint(1, 365))
+
+    def users(self):
+        rng = random.Random(self.args.seed + 1)
+        for user_id, created in zip(self.user_ids, self._user_created()):
+            yield (
+                user_id, f"seed-{user_id}@example.com", rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                True, True, "user", created, created
+            )
+
+    def credentials(self, first_credential_id: int, hashed_password: str):
+        for offset, (user_id, created) in enumerate(zip(self.user_ids, self._user_created())):
+            yield first_credential_id + offset, user_id, f"seed{user_id}", hashed_password, created, created
+
+    def chats(self):
+        for index, chat_id in enumerate(self.chat_ids):
+            members = self.members[index]
+            name = None if len(members) == 2 else f"{TOPICS[chat_id % len(TOPICS)]} {chat_id}"
+            created = self.chat_starts[index]
+            yield chat_id, name, created, created, created
+
+    def chat_members(self):
+        rng = random.Random(self.args.seed + 3)
+        for index, chat_id in enumerate(self.chat_ids):
+            count = self.message_counts[index]
+            last_id = self.first_message_ids[index] + count - 1
+            for position, user_id in enumerate(self.members[index]):
+                unread = rng.randint(1, min(count, 50)) if count and rng.random() < self.args.unread_ratio else 0
+                last_read = last_id - unread if count > unread else None
+                yield (
+                    chat_id, user_id, self.chat_starts[index], "owner" if position == 0 else "member",
+                    last_read, unread
+                )
+
+    def messages(self):
+        rng = random.Random(self.args.seed + 4)
+        for index, chat_id in enumerate(self.chat_ids):
+            count = self.message_counts[index]
+            members = self.members[index]
+            start = self.chat_starts[index]
+            span = (self.end - start).total_seconds()
+            offsets = sorted(rng.random() * span for _ in range(count))
+            for position, offset in enumerate(offsets):
+                created = start + timedelta(seconds=offset)
+                text = " ".join(rng.choices(WORDS, k=rng.randint(2, 24)))
+                yield (
+                    self.first_message_ids[index] + position, chat_id, rng.choice(members),
+                    text.capitalize(), created, created
+                )
+
+
+SUMMARY_SQL = f"""
+UPDATE "Chat" AS c
+SET "messageCount" = m."count",
+    "lastMessageId" = last."id",
+    "lastMessageUserId" = last."userId",
+    "lastMessagePreview" = LEFT(last."message", {MESSAGE_PREVIEW_LENGTH}),
+    "lastMessageAt" = last."createdAt",
+    "lastUsed" = last."createdAt",
+    "updatedAt" = last."createdAt"
+FROM (
+    SELECT "chatId", COUNT(*) AS "count" FROM "ChatMessage" WHERE "chatId" >= %(first_chat_id)s GROUP BY "chatId"
+) AS m
+JOIN (
+    SELECT DISTINCT ON ("chatId") "chatId", "id", "userId", "message", "createdAt"
+    FROM "ChatMessage"
+    WHERE "chatId" >= %(first_chat_id)s
+    ORDER BY "chatId", "createdAt" DESC, "id" DESC
+) AS last ON last."chatId" = m."chatId"
+WHERE c."id" = m."chatId"
+"""
+
+
+def _step(label: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    suffix = f"{result:,} rows " if isinstance(result, int) else ""
+    print(f"{label:<24} {suffix}in {time.perf_counter() - start:.1f}s")
+    return result
+
+
+def seed(args):
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if args.truncate:
+            _step("truncate", cursor.execute, 'TRUNCATE "ChatMessage", "ChatUser", "Chat", "Credential", "User" RESTART IDENTITY CASCADE')
+
+        plan = SeedPlan(args, _next_id(cursor, "User"), _next_id(cursor, "Chat"), _next_id(cursor, "ChatMessage"))
+        # One bcrypt hash for everyone: hashing per user would take longer than the whole COPY
+        hashed_password = _hash_password_sync(args.password)
+
+        _step("User", copy_rows, cursor, "User", (
+            "id", "email", "firstName", "lastName", "emailVerified", "isApproved", "role", "createdAt", "updatedAt"
+        ), plan.users())
+        _step("Credential", copy_rows, cursor, "Credential", (
+            "id", "userId", "username", "password", "createdAt", "updatedAt"
+        ), plan.credentials(_next_id(cursor, "Credential"), hashed_password))
+        _step("Chat", copy_rows, cursor, "Chat", (
+            "id", "name", "createdAt", "updatedAt", "lastUsed"
+        ), plan.chats())
+        _step("ChatUser", copy_rows, cursor, "ChatUser", (
+            "chatId", "userId", "joinedAt", "role", "lastReadMessageId", "unreadCount"
+        ), plan.chat_members())
+        _step("ChatMessage", copy_rows, cursor, "ChatMessage", (
+            "id", "chatId", "userId", "message", "createdAt", "updatedAt"
+        ), plan.messages())
+
+        _step("chat summaries", cursor.execute, SUMMARY_SQL, {"first_chat_id": plan.chat_ids.start})
+        for table in ("User", "Credential", "Chat", "ChatMessage"):
+            _sync_sequence(cursor, table)
+        # Fresh statistics so the planner picks the indexes on the new volume right away
+        _step("analyze", cursor.execute, 'ANALYZE "User", "Credential", "Chat", "ChatUser", "ChatMessage"')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--max-members", type=int, default=50, help="Largest chat size")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of messages per chat (0 = even)")
+    parser.add_argument("--unread-ratio", type=float, default=0.3, help="Share of members with unread messages")
+    parser.add_argument("--days", type=int, default=180, help="History length")
+    parser.add_argument(
+        "--end", type=datetime.fromisoformat, default=datetime.fromisoformat("2026-01-01T00:00:00+00:00"),
+        help="Timestamp of the newest history (fixed, so reruns are identical)"
+    )
+    parser.add_argument("--password", default="password123", help="Password of every seeded user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Empty the tables first (destroys existing data)")
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2 (chats need two members)")
+
+    start = time.perf_counter()
+    seed(args)
+    print(f"seeded {args.users:,} users, {args.chats:,} chats, {args.messages:,} messages "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+-- Keyset pagination index for chat message history
+-- Covers WHERE "chatId" = ? AND ("createdAt", "id") < (?, ?) ORDER BY "createdAt" DESC, "id" DESC
+-- Replaces the (chatId, createdAt) index, which is a prefix of this one
+
+-- DropIndex
+DROP INDEX IF EXISTS "ChatMessage_chatId_createdAt_idx";
+
+-- CreateIndex
+CREATE INDEX "ChatMessage_chatId_createdAt_id_idx" ON "ChatMessage"("chatId", "createdAt", "id");
@@ -0,0 +1,38 @@
+-- Denormalised chat summary: last message, message count and per-member read state
+-- Lets the chat list render unread counts and previews from Chat/ChatUser alone
+
+-- AlterTable
+ALTER TABLE "Chat" ADD COLUMN "messageCount" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "lastMessageId" INTEGER,
+ADD COLUMN "lastMessageUserId" INTEGER,
+ADD COLUMN "lastMessagePreview" TEXT,
+ADD COLUMN "lastMessageAt" TIMESTAMP(3);
+
+-- AlterTable
+ALTER TABLE "ChatUser" ADD COLUMN "lastReadMessageId" INTEGER,
+ADD COLUMN "unreadCount" INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill message counts
+UPDATE "Chat" AS c
+SET "messageCount" = m."count"
+FROM (SELECT "chatId", COUNT(*) AS "count" FROM "ChatMessage" GROUP BY "chatId") AS m
+WHERE m."chatId" = c."id";
+
+-- Backfill last messages (preview length matches MESSAGE_PREVIEW_LENGTH)
+UPDATE "Chat" AS c
+SET "lastMessageId" = m."id",
+    "lastMessageUserId" = m."userId",
+    "lastMessagePreview" = LEFT(m."message", 120),
+    "lastMessageAt" = m."createdAt"
+FROM (
+    SELECT DISTINCT ON ("chatId") "chatId", "id", "userId", "message", "createdAt"
+    FROM "ChatMessage"
+    ORDER BY "chatId", "createdAt" DESC, "id" DESC
+) AS m
+WHERE m."chatId" = c."id";
+
+-- Existing history counts as read
+UPDATE "ChatUser" AS cu
+SET "lastReadMessageId" = c."lastMessageId"
+FROM "Chat" AS c
+WHERE c."id" = cu."chatId";
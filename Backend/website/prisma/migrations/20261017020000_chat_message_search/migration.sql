@@ -0,0 +1,10 @@
+-- Full-text search over chat messages
+-- 'simple' configuration: no stemming or stop words, words are split on spaces and punctuation.
+-- Thai is not segmented: a run of Thai text without spaces is one token, so only whole runs match
+
+-- AlterTable
+ALTER TABLE "ChatMessage" ADD COLUMN "searchVector" tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', "message")) STORED;
+
+-- CreateIndex
+CREATE INDEX "ChatMessage_searchVector_idx" ON "ChatMessage" USING GIN ("searchVector");
@@ -0,0 +1,41 @@
+-- Chat.lastMessageId references its message: deleting that message (also through cascades,
+-- e.g. deleting its sender) clears it instead of leaving a dangling id
+
+-- Repair summaries left stale by cascaded deletes (same as the chat_summary backfill)
+UPDATE "Chat" AS c
+SET "messageCount" = (SELECT COUNT(*) FROM "ChatMessage" AS m WHERE m."chatId" = c."id"),
+    "lastMessageId" = NULL,
+    "lastMessageUserId" = NULL,
+    "lastMessagePreview" = NULL,
+    "lastMessageAt" = NULL;
+
+UPDATE "Chat" AS c
+SET "lastMessageId" = m."id",
+    "lastMessageUserId" = m."userId",
+    "lastMessagePreview" = LEFT(m."message", 120),
+    "lastMessageAt" = m."createdAt"
+FROM (
+    SELECT DISTINCT ON ("chatId") "chatId", "id", "userId", "message", "createdAt"
+    FROM "ChatMessage"
+    ORDER BY "chatId", "createdAt" DESC, "id" DESC
+) AS m
+WHERE m."chatId" = c."id";
+
+UPDATE "ChatUser" AS cu
+SET "unreadCount" = (
+    SELECT COUNT(*) FROM "ChatMessage" AS m
+    WHERE m."chatId" = cu."chatId"
+      AND m."id" > COALESCE(cu."lastReadMessageId", 0)
+      AND m."userId" <> cu."userId"
+);
+
+-- CreateIndex
+CREATE INDEX "Chat_lastMessageId_idx" ON "Chat"("lastMessageId");
+
+-- AddForeignKey
+ALTER TABLE "Chat"
+  ADD CONSTRAINT "Chat_lastMessageId_fkey"
+  FOREIGN KEY ("lastMessageId")
+  REFERENCES "ChatMessage"("id")
+  ON DELETE SET NULL
+  ON UPDATE CASCADE;
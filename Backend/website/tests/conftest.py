@@ -0,0 +1,55 @@
+"""
+Shared test fixtures
+Tests using `client` run the app in-process against TEST_DATABASE_URL (tables are created if missing,
+nothing is dropped; every test creates its own users and chats). Without TEST_DATABASE_URL those tests
+are skipped; unit tests of app.utils modules need no database.
+"""
+import os
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Before app.database is imported (load_dotenv never overrides a variable that is already set)
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient running the app's startup/shutdown hooks"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(client):
+    """Create a verified, approved user (or admin) and log in; returns (user_id, auth headers)"""
+    from sqlalchemy import update
+    from app.database import SessionLocal
+    from app.models import User
+
+    def create(password: str = "secret123", role: str = "user"):
+        name = f"test-{uuid.uuid4().hex[:12]}"
+        response = client.post("/users", json={
+            "email": f"{name}@example.com",
+            "username": name,
+            "password": password,
+            "firstName": "Test",
+            "lastName": name
+        })
+        assert response.status_code == 201, response.text
+        user_id = response.json()["id"]
+        with SessionLocal() as db:
+            db.execute(update(User).where(User.id == user_id).values(emailVerified=True, isApproved=True, role=role))
+            db.commit()
+        response = client.post("/auth/login", json={"email": f"{name}@example.com", "password": password})
+        assert response.status_code == 200, response.text
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return create
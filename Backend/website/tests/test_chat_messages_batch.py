@@ -0,0 +1,96 @@
+"""
+Bulk message import (POST /chats/{chat_id}/messages:batch)
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# More rows than one insertmanyvalues page (1000 by default), so the INSERT is sent in several statements
+BATCH_SIZE = 2500
+
+
+@pytest.fixture
+def naive_message_times(client):
+    """
+    Chat.lastMessageAt / ChatMessage.createdAt as Prisma migrations create them (TIMESTAMP(3), no time zone)
+    instead of create_all's timestamptz, for the duration of a test
+    """
+    from sqlalchemy import text
+    from app.database import engine, async_engine
+
+    def alter(column_type: str):
+        client.portal.call(async_engine.dispose)  # Drop connections holding prepared statements of the old type
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE "Chat" ALTER COLUMN "lastMessageAt" TYPE {column_type}'))
+            conn.execute(text(f'ALTER TABLE "ChatMessage" ALTER COLUMN "createdAt" TYPE {column_type}'))
+
+    alter("TIMESTAMP(3)")
+    try:
+        yield
+    finally:
+        alter("TIMESTAMP WITH TIME ZONE")
+
+
+def test_batch_larger_than_one_insert_page(client, make_user):
+    _, headers = make_user()
+    chat_id = client.post("/chats", json={"name": "import"}, headers=headers).json()["id"]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    messages = [
+        {"message": f"imported {n}", "createdAt": (start + timedelta(minutes=n)).isoformat()}
+        for n in range(BATCH_SIZE)
+    ]
+
+    response = client.post(f"/chats/{chat_id}/messages:batch", json={"messages": messages}, headers=headers)
+    assert response.status_code == 201, response.text
+    rows = response.json()
+    assert [row["message"] for row in rows] == [item["message"] for item in messages]
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(ids) and len(set(ids)) == BATCH_SIZE
+    assert rows[0]["createdAt"].startswith("2024-01-01T00:00:00")
+
+    chat = client.get(f"/chats/{chat_id}", headers=headers).json()
+    assert chat["messageCount"] == BATCH_SIZE and chat["lastMessageId"] == ids[-1]
+
+    # History keeps the original timing: newest first
+    page = client.get(f"/chats/{chat_id}/messages", params={"limit": 3}, headers=headers).json()
+    assert [message["id"] for message in page] == ids[:-4:-1]
+
+
+def test_batch_rejects_out_of_order_timestamps(client, make_user):
+    _, headers = make_user()
+    chat_id = client.post("/chats", json={"name": "import"}, headers=headers).json()["id"]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    messages = [
+        {"message": "later", "createdAt": (start + timedelta(hours=1)).isoformat()},
+        {"message": "earlier", "createdAt": start.isoformat()},
+    ]
+    response = client.post(f"/chats/{chat_id}/messages:batch", json={"messages": messages}, headers=headers)
+    assert response.status_code == 400, response.text
+
+    # Not before the chat's newest message either
+    client.post(f"/chats/{chat_id}/messages", json={"message": "now"}, headers=headers)
+    response = client.post(
+        f"/chats/{chat_id}/messages:batch",
+        json={"messages": [{"message": "old", "createdAt": start.isoformat()}]},
+        headers=headers
+    )
+    assert response.status_code == 400, response.text
+    assert client.get(f"/chats/{chat_id}", headers=headers).json()["messageCount"] == 1
+
+
+def test_batch_into_chat_with_naive_last_message_time(client, make_user, naive_message_times):
+    _, headers = make_user()
+    chat_id = client.post("/chats", json={"name": "import"}, headers=headers).json()["id"]
+    assert client.post(f"/chats/{chat_id}/messages", json={"message": "existing"}, headers=headers).status_code == 201
+
+    messages = [{"message": "dated", "createdAt": datetime.now(timezone.utc).isoformat()}, {"message": "imported"}]
+    response = client.post(f"/chats/{chat_id}/messages:batch", json={"messages": messages}, headers=headers)
+    assert response.status_code == 201, response.text
+
+    response = client.post(
+        f"/chats/{chat_id}/messages:batch",
+        json={"messages": [{"message": "old", "createdAt": "2024-01-01T00:00:00Z"}]},
+        headers=headers
+    )
+    assert response.status_code == 400, response.text
+    assert client.get(f"/chats/{chat_id}", headers=headers).json()["messageCount"] == 3
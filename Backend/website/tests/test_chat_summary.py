@@ -0,0 +1,54 @@
+"""
+Chat summary maintenance (app/utils/chat_summary.py)
+"""
+
+
+def _chat(client, headers, chat_id: int) -> dict:
+    response = client.get(f"/chats/{chat_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_delete_message_keeps_last_used(client, make_user):
+    _, headers = make_user()
+    chat_id = client.post("/chats", json={"name": "summary"}, headers=headers).json()["id"]
+    first = client.post(f"/chats/{chat_id}/messages", json={"message": "first"}, headers=headers).json()
+    second = client.post(f"/chats/{chat_id}/messages", json={"message": "second"}, headers=headers).json()
+    before = _chat(client, headers, chat_id)
+    assert before["messageCount"] == 2 and before["lastMessageId"] == second["id"]
+
+    # Not the last message: only the count changes
+    assert client.delete(f"/chats/{chat_id}/messages/{first['id']}", headers=headers).status_code == 200
+    after = _chat(client, headers, chat_id)
+    assert after["messageCount"] == 1 and after["lastMessageId"] == second["id"]
+    assert after["lastUsed"] == before["lastUsed"]
+
+    # The last message: the summary falls back to the newest remaining one (none left)
+    assert client.delete(f"/chats/{chat_id}/messages/{second['id']}", headers=headers).status_code == 200
+    after = _chat(client, headers, chat_id)
+    assert after["messageCount"] == 0 and after["lastMessageId"] is None
+    assert after["lastUsed"] == before["lastUsed"]
+
+
+def _summary(client, headers, chat_id: int) -> dict:
+    response = client.get("/chats/summary", headers=headers)
+    assert response.status_code == 200, response.text
+    return next(chat for chat in response.json() if chat["id"] == chat_id)
+
+
+def test_deleting_a_user_rebuilds_summaries_of_their_chats(client, make_user):
+    _, headers = make_user()
+    other_id, other_headers = make_user()
+    chat_id = client.post("/chats", json={"name": "summary", "user_ids": [other_id]}, headers=headers).json()["id"]
+    mine = client.post(f"/chats/{chat_id}/messages", json={"message": "mine"}, headers=headers).json()
+    for n in range(3):
+        client.post(f"/chats/{chat_id}/messages", json={"message": f"theirs {n}"}, headers=other_headers)
+    before = _summary(client, headers, chat_id)
+    assert before["messageCount"] == 4 and before["unreadCount"] == 3
+
+    # Their messages go with them (FK cascade)
+    assert client.delete(f"/users/{other_id}", headers=other_headers).status_code == 200
+    after = _summary(client, headers, chat_id)
+    assert after["messageCount"] == 1 and after["unreadCount"] == 0
+    assert after["lastMessage"]["id"] == mine["id"]
+    assert after["lastUsed"] == before["lastUsed"]
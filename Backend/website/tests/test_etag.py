@@ -0,0 +1,38 @@
+"""
+ETags of the chat list (app/utils/etag.py)
+"""
+from datetime import datetime, timezone
+
+
+def test_chat_list_etag_changes_when_chats_swap_for_same_id_sum(client, make_user):
+    from sqlalchemy import delete, func, insert, select
+    from app.database import SessionLocal
+    from app.models import Chat, chat_users
+
+    user_id, headers = make_user()
+    stamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with SessionLocal() as db:
+        # Explicit ids above the sequence, so the swapped sets keep count, id sum and every timestamp
+        base = db.scalar(select(func.max(Chat.id))) + 1000
+        ids = [base + n for n in (2, 3, 4, 5)]
+        db.execute(insert(Chat), [
+            {"id": chat_id, "name": "etag", "createdAt": stamp, "updatedAt": stamp, "lastUsed": stamp}
+            for chat_id in ids
+        ])
+        db.execute(insert(chat_users), [{"chatId": ids[0], "userId": user_id}, {"chatId": ids[3], "userId": user_id}])
+        db.commit()
+    try:
+        etag = client.get("/chats", headers=headers).headers["ETag"]
+
+        with SessionLocal() as db:
+            db.execute(delete(chat_users).where(chat_users.c.userId == user_id))
+            db.execute(insert(chat_users), [{"chatId": ids[1], "userId": user_id}, {"chatId": ids[2], "userId": user_id}])
+            db.commit()
+
+        response = client.get("/chats", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert sorted(chat["id"] for chat in response.json()) == ids[1:3]
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Chat).where(Chat.id.in_(ids)))
+            db.commit()
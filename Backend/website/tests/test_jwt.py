@@ -0,0 +1,74 @@
+"""
+Verified-token cache (app/utils/jwt.py)
+"""
+import hashlib
+import types
+from collections import OrderedDict
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import jwt as jwt_utils
+
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch):
+    """Fresh cache and counters for every test"""
+    cache = OrderedDict()
+    monkeypatch.setattr(jwt_utils, "_token_cache", cache)
+    monkeypatch.setattr(jwt_utils, "_token_cache_stats", {"hits": 0, "misses": 0})
+    return cache
+
+
+def _token(sub: str) -> str:
+    return jwt_utils.create_access_token({"sub": sub})
+
+
+def test_repeat_verification_is_served_from_cache(token_cache):
+    token = _token("1")
+    assert jwt_utils.verify_token(token)["sub"] == "1"
+    payload = jwt_utils.verify_token(token)
+    assert payload["sub"] == "1"
+    assert jwt_utils.get_token_cache_stats() == {"size": 1, "maxsize": jwt_utils.TOKEN_CACHE_SIZE, "hits": 1, "misses": 1}
+
+    # Callers get a copy, never the cached payload itself
+    payload["sub"] = "2"
+    assert jwt_utils.verify_token(token)["sub"] == "1"
+
+
+def test_cache_is_keyed_by_token_sha256(token_cache):
+    token = _token("1")
+    jwt_utils.verify_token(token)
+    assert list(token_cache) == [hashlib.sha256(token.encode("utf-8")).digest()]
+    assert token not in token_cache
+
+
+def test_expired_entry_is_verified_again(token_cache, monkeypatch):
+    token = _token("1")
+    exp = jwt_utils.verify_token(token)["exp"]
+    monkeypatch.setattr(jwt_utils, "time", types.SimpleNamespace(time=lambda: exp + 1))
+    jwt_utils.verify_token(token)
+    assert jwt_utils.get_token_cache_stats()["misses"] == 2
+    assert jwt_utils.get_token_cache_stats()["hits"] == 0
+
+
+def test_least_recently_used_token_is_evicted(token_cache, monkeypatch):
+    monkeypatch.setattr(jwt_utils, "TOKEN_CACHE_SIZE", 2)
+    first, second, third = _token("1"), _token("2"), _token("3")
+    jwt_utils.verify_token(first)
+    jwt_utils.verify_token(second)
+    jwt_utils.verify_token(first)  # Now the most recently used
+    jwt_utils.verify_token(third)
+
+    key = lambda token: hashlib.sha256(token.encode("utf-8")).digest()
+    assert list(token_cache) == [key(first), key(third)]
+
+
+def test_invalid_tokens_are_rejected_and_not_cached(token_cache):
+    expired = jwt_utils.create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=-1))
+    for token in (expired, _token("1") + "x"):
+        with pytest.raises(HTTPException) as error:
+            jwt_utils.verify_token(token)
+        assert error.value.status_code == 401
+    assert not token_cache
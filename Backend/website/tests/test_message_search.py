@@ -0,0 +1,20 @@
+"""
+Full-text message search (app/utils/message_search.py)
+"""
+
+
+def test_snippet_escapes_message_html(client, make_user):
+    _, headers = make_user()
+    chat_id = client.post("/chats", json={"name": "search"}, headers=headers).json()["id"]
+    text = 'needle <img src=x onerror="alert(1)"> & \x02needle\x03 <b>bold</b>'
+    client.post(f"/chats/{chat_id}/messages", json={"message": text}, headers=headers)
+
+    response = client.get(f"/chats/{chat_id}/messages/search", params={"q": "needle"}, headers=headers)
+    assert response.status_code == 200, response.text
+    (hit,) = response.json()
+    assert hit["message"] == text
+    snippet = hit["snippet"]
+    assert snippet.count("<mark>needle</mark>") == 2
+    # The only markup left is the highlighting
+    assert snippet.replace("<mark>", "").replace("</mark>", "").count("<") == 0
+    assert "&amp;" in snippet and "\x02" not in snippet and "\x03" not in snippet
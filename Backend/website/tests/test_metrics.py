@@ -0,0 +1,20 @@
+"""
+Prometheus metrics endpoint (app/routers/metrics.py)
+"""
+
+
+def test_metrics_requires_admin_or_scrape_token(client, make_user, monkeypatch):
+    from app.routers import metrics
+
+    assert client.get("/metrics").status_code == 401
+    _, user_headers = make_user()
+    assert client.get("/metrics", headers=user_headers).status_code == 403
+
+    _, admin_headers = make_user(role="admin")
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
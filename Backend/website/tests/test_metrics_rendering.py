@@ -0,0 +1,64 @@
+"""
+Request metrics and Prometheus text rendering (app/utils/metrics.py)
+"""
+from app.utils.metrics import Histogram, RequestMetrics, render_gauge, render_metric
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.samples("latency", {"route": "/x"}) == [
+        ("latency_bucket", {"route": "/x", "le": "0.1"}, 2),
+        ("latency_bucket", {"route": "/x", "le": "1"}, 3),
+        ("latency_bucket", {"route": "/x", "le": "+Inf"}, 4),
+        ("latency_sum", {"route": "/x"}, 5.65),
+        ("latency_count", {"route": "/x"}, 4),
+    ]
+
+
+def test_render_metric_escapes_label_values():
+    lines = render_metric("things_total", "counter", "Things", [({"name": 'a"b\\c\nd'}, 3), ({}, 1.5)])
+    assert lines == [
+        "# HELP things_total Things",
+        "# TYPE things_total counter",
+        'things_total{name="a\\"b\\\\c\\nd"} 3',
+        "things_total 1.5",
+    ]
+
+
+def test_render_gauge_without_value_is_zero():
+    assert render_gauge("pool_size", "Pool size", None, {"pool": "db"}) == [
+        "# HELP pool_size Pool size",
+        "# TYPE pool_size gauge",
+        'pool_size{pool="db"} 0',
+    ]
+
+
+def test_request_metrics_render():
+    metrics = RequestMetrics(buckets=(0.5,))
+    metrics.observe("GET", "/chats", 200, 0.2)
+    metrics.observe("GET", "/chats", 304, 0.7)
+    metrics.observe_queries("GET", "/chats", 3, 0.01)
+    metrics.in_flight = 1
+
+    text = metrics.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    for line in (
+        'http_requests_total{method="GET",route="/chats",status="200"} 1',
+        'http_requests_total{method="GET",route="/chats",status="304"} 1',
+        "http_requests_in_flight 1",
+        'http_request_db_queries_total{method="GET",route="/chats"} 3',
+        "# TYPE http_request_duration_seconds histogram",
+        'http_request_duration_seconds_bucket{method="GET",route="/chats",le="0.5"} 1',
+        'http_request_duration_seconds_bucket{method="GET",route="/chats",le="+Inf"} 2',
+        'http_request_duration_seconds_count{method="GET",route="/chats"} 2',
+    ):
+        assert line in lines
+    # Every sample belongs to a declared family
+    families = {line.split()[2] for line in lines if line.startswith("# TYPE")}
+    for line in lines:
+        if not line.startswith("#"):
+            name = line.split("{")[0].split()[0]
+            assert name in families or name.rsplit("_", 1)[0] in families
@@ -0,0 +1,45 @@
+"""
+Allowed-origin matching (app/utils/origins.py)
+"""
+from app.utils.origins import DEFAULT_ORIGIN_REGEX, DEFAULT_ORIGINS, OriginMatcher
+
+
+def test_exact_origins():
+    matcher = OriginMatcher([" http://app.test ", "", "https://admin.test"])
+    assert matcher.origins == {"http://app.test", "https://admin.test"}
+    assert matcher.is_allowed("http://app.test")
+    assert matcher.is_allowed("https://admin.test")
+    assert not matcher.is_allowed("https://app.test")
+    assert not matcher.is_allowed("http://app.test/")
+
+
+def test_regex_must_match_the_whole_origin():
+    matcher = OriginMatcher([], r"https://[a-z]+\.example\.com")
+    assert matcher.is_allowed("https://shop.example.com")
+    assert not matcher.is_allowed("https://shop.example.com.attacker.net")
+    assert not matcher.is_allowed("http://shop.example.com")
+    assert not matcher.is_allowed("evilhttps://shop.example.com")
+
+
+def test_missing_origin_is_rejected():
+    matcher = OriginMatcher(["http://app.test"], ".*")
+    assert not matcher.is_allowed(None)
+    assert not matcher.is_allowed("")
+
+
+def test_default_policy():
+    matcher = OriginMatcher(DEFAULT_ORIGINS.split(","), DEFAULT_ORIGIN_REGEX)
+    assert matcher.is_allowed("http://localhost:3000")
+    assert matcher.is_allowed("http://192.168.1.20:3000")
+    assert matcher.is_allowed("http://172.31.0.5:8000")
+    assert not matcher.is_allowed("http://172.32.0.5:3000")  # Not a private range
+    assert not matcher.is_allowed("http://10.0.0.1:5432")
+    assert not matcher.is_allowed("https://localhost:3000")
+
+
+def test_lookups_are_memoised_and_bounded():
+    matcher = OriginMatcher(["http://app.test"], cache_size=2)
+    for origin in ("http://app.test", "http://app.test", "http://a", "http://b"):
+        matcher.is_allowed(origin)
+    info = matcher.cache_info()
+    assert (info.hits, info.currsize, info.maxsize) == (1, 2, 2)
@@ -0,0 +1,86 @@
+"""
+Password worker pool admission control and CPU sizing (app/utils/password.py)
+"""
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import password
+
+
+def _pool():
+    return password.PasswordPool(ThreadPoolExecutor(max_workers=1), workers=1, max_queue=1)
+
+
+def test_full_pool_rejects_with_503_and_retry_after():
+    release = threading.Event()
+
+    async def scenario():
+        pool = _pool()
+        # One running + one queued fills workers=1, max_queue=1
+        running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        try:
+            await asyncio.sleep(0)
+            assert (pool.in_flight, pool.queued) == (2, 1)
+
+            pool.avg_run_seconds = 1.2
+            with pytest.raises(HTTPException) as error:
+                await pool.run(release.wait)
+            assert error.value.status_code == 503
+            assert error.value.headers["Retry-After"] == "3"  # ceil(2 in flight / 1 worker * 1.2s)
+            assert pool.rejected == 1
+        finally:
+            release.set()
+        await asyncio.gather(*running)
+        assert (pool.in_flight, pool.completed) == (0, 2)
+        # Room again once the backlog drained
+        assert await pool.run(lambda: "ok") == "ok"
+        pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_is_at_least_one_second():
+    pool = _pool()
+    assert pool.retry_after() == 1
+    pool.shutdown()
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    """available_cpus() on an 8-CPU affinity mask with the given /sys/fs/cgroup/cpu.max contents"""
+    monkeypatch.setattr(password.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+    def with_cpu_max(contents):
+        def fake_open(path, *args, **kwargs):
+            assert path == "/sys/fs/cgroup/cpu.max"
+            if contents is None:
+                raise FileNotFoundError(path)
+            return io.StringIO(contents)
+        monkeypatch.setattr(password, "open", fake_open, raising=False)
+        return password.available_cpus()
+
+    return with_cpu_max
+
+
+@pytest.mark.parametrize("cpu_max, expected", [
+    ("200000 100000\n", 2),  # docker --cpus=2
+    ("150000 100000\n", 2),  # Fractional quotas round up
+    ("50000 100000\n", 1),
+    ("1600000 100000\n", 8),  # A quota above the affinity mask doesn't add CPUs
+    ("max 100000\n", 8),  # No limit
+    (None, 8),  # No cgroup v2
+    ("garbage\n", 8),
+])
+def test_available_cpus_caps_affinity_by_cgroup_quota(cpus, cpu_max, expected):
+    assert cpus(cpu_max) == expected
+
+
+def test_available_cpus_without_affinity_falls_back_to_cpu_count(cpus, monkeypatch):
+    monkeypatch.delattr(password.os, "sched_getaffinity", raising=False)
+    monkeypatch.setattr(password.os, "cpu_count", lambda: 4)
+    assert cpus("300000 100000\n") == 3